@@ -0,0 +1,97 @@
+"""
+Сравнение кодирования сообщений по одному и пачками (EmbeddingBatcher).
+
+Сообщения приходят с заданной частотой, для каждого считается задержка
+от прихода до получения эмбеддинга. По умолчанию используется модель-
+заглушка с фиксированной стоимостью вызова и стоимостью на текст;
+с флагом --real используется настоящая модель sentence_transformers.
+
+Запуск: poetry run python -m benchmarks.embedding_batcher_bench [--real]
+"""
+import asyncio
+import logging
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+
+from bot.config.settings import SEMANTIC_MODEL_NAME
+from bot.utils.embedding_batcher import EmbeddingBatcher
+
+MESSAGES = 400
+RATES = [50, 200, 500]  # сообщений в секунду
+CALL_OVERHEAD = 0.008  # секунд на вызов модели-заглушки
+PER_TEXT_COST = 0.0003  # секунд на текст в модели-заглушке
+
+
+class FakeModel:
+    """Модель-заглушка: один экземпляр, вызовы выполняются по очереди."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        with self._lock:
+            time.sleep(CALL_OVERHEAD + PER_TEXT_COST * len(texts))
+        return np.zeros((len(texts), 384), dtype=np.float32)
+
+
+def load_encoder():
+    if "--real" not in sys.argv:
+        return FakeModel().encode
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(SEMANTIC_MODEL_NAME)
+    return lambda texts: model.encode(texts, normalize_embeddings=True)
+
+
+async def drive(embed, rate: int):
+    """Подаёт сообщения с частотой rate и собирает задержки."""
+    latencies = []
+
+    async def one(i):
+        started = time.perf_counter()
+        await embed(f"сообщение номер {i}: как получить доступ на препрод")
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(MESSAGES):
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return MESSAGES / elapsed, latencies
+
+
+def report(mode: str, rate: int, throughput: float, latencies) -> None:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"{mode:>10} {rate:>6} {throughput:>11.0f} "
+          f"{p50:>9.1f} {p95:>9.1f}")
+
+
+async def main() -> None:
+    logging.disable(logging.CRITICAL)
+    encode = load_encoder()
+    encode(["прогрев"])
+
+    async def per_message(text):
+        return (await asyncio.to_thread(encode, [text]))[0]
+
+    print(f"{'mode':>10} {'rate/s':>6} {'throughput':>11} "
+          f"{'p50, ms':>9} {'p95, ms':>9}")
+    for rate in RATES:
+        throughput, latencies = await drive(per_message, rate)
+        report("single", rate, throughput, latencies)
+
+        batcher = EmbeddingBatcher(encode)
+        throughput, latencies = await drive(batcher.embed, rate)
+        await batcher.stop()
+        report("batched", rate, throughput, latencies)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
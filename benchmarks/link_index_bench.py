@@ -0,0 +1,92 @@
+"""
+Сравнение стоимости поиска ссылок на одно сообщение:
+старый рекурсивный обход LINKS с re.search по сырым строкам
+против предкомпилированного LinkIndex.
+
+Запуск: poetry run python -m benchmarks.link_index_bench
+"""
+import copy
+import logging
+import re
+import timeit
+
+from bot.config.links import LINKS
+from bot.messages.link_index import LinkIndex
+
+MESSAGES = [
+    "всем привет, кто сегодня на созвоне?",
+    "скиньте доступ на препрод пожалуйста",
+    "как настроить charles на маке",
+    "ребята, а где посмотреть график релизов",
+    "у меня не собирается проект после мержа",
+    "подскажите по ЕПА авторизация падает",
+    "ок, спасибо",
+    "где взять сборку на сегодня",
+]
+SCALES = [1, 5, 20]
+ROUNDS = 50
+
+
+def legacy_search(data, keyword, results):
+    """Поиск в том виде, в котором он был до LinkIndex."""
+    for key, value in data.items():
+        if isinstance(value, dict) and "url" in value and "regex" in value:
+            if any(re.search(regex, keyword, re.IGNORECASE)
+                   for regex in value.get("regex", [])):
+                results.append((key, value["url"]))
+        elif isinstance(value, dict) and "subsections" in value:
+            legacy_search(value["subsections"], keyword, results)
+
+
+def scaled_links(scale: int) -> dict:
+    """Размножает LINKS, добавляя к каждому разделу уникальный суффикс."""
+    links = {}
+    for i in range(scale):
+        for name, section in LINKS.items():
+            section = copy.deepcopy(section)
+            for sub in section.get("subsections", {}).values():
+                sub["regex"] = [f"{p}{i}" if i else p
+                                for p in sub.get("regex", [])]
+            if "regex" in section:
+                section["regex"] = [f"{p}{i}" if i else p
+                                    for p in section["regex"]]
+            links[f"{name} #{i}"] = section
+    return links
+
+
+def check_same_results(links: dict, index: LinkIndex, messages) -> None:
+    for message in messages:
+        expected = []
+        legacy_search(links, message, expected)
+        assert index.search(message, limit=3) == expected[:3], message
+
+
+def main() -> None:
+    logging.disable(logging.CRITICAL)
+    messages = [m.lower() for m in MESSAGES]
+    print(f"{'scale':>6} {'entries':>8} {'legacy, us':>11} "
+          f"{'index, us':>10} {'speedup':>8}")
+    for scale in SCALES:
+        links = scaled_links(scale)
+        index = LinkIndex.from_links(links)
+
+        check_same_results(links, index, messages)
+
+        def run_legacy():
+            for message in messages:
+                found = []
+                legacy_search(links, message, found)
+
+        def run_index():
+            for message in messages:
+                index.search(message, limit=3)
+
+        per_message = ROUNDS * len(messages)
+        legacy = timeit.timeit(run_legacy, number=ROUNDS) / per_message
+        indexed = timeit.timeit(run_index, number=ROUNDS) / per_message
+        print(f"{scale:>6} {len(index.entries):>8} {legacy * 1e6:>11.1f} "
+              f"{indexed * 1e6:>10.1f} {legacy / indexed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,104 +1,115 @@
+import asyncio
 import logging
-from typing import Optional, Tuple, Dict, Any
+from typing import Dict, List, Optional, Tuple
 
 from aiogram import Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
+from sqlalchemy import select
 
 from bot.config.flags import ANNOUNCE_ENABLE
+from bot.config.settings import ANNOUNCE_INPUT_TIMEOUT
 from bot.database import SessionLocal
-from bot.models import Chat, AdminUser
+from bot.models import Chat
+from bot.utils.announce_jobs import (
+    announce_runner,
+    create_job,
+    format_job_report,
+    get_job,
+    message_media
+)
+from bot.utils.fsm_timeouts import fsm_storage
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+# Сколько секунд ждать остальные файлы альбома
+ALBUM_COLLECT_DELAY = 1.0
+# Максимальный размер альбома в Telegram
+MAX_ALBUM_SIZE = 10
+
+# Собираемые альбомы: media_group_id -> сообщения
+album_buffer: Dict[str, List[types.Message]] = {}
+
 
 # Определяем FSM для команды announce
 class AnnounceState(StatesGroup):
     waiting_for_announce = State()
 
 
+fsm_storage.register(AnnounceState.waiting_for_announce,
+                     ANNOUNCE_INPUT_TIMEOUT,
+                     "Время ожидания текста рассылки истекло, "
+                     "рассылка отменена.")
+
+
+def announce_text(message: types.Message) -> Optional[str]:
+    """
+    Текст рассылки из сообщения (или подписи к медиа) без команды.
+    """
+    text = (message.text or message.caption or "").strip()
+    if text.startswith("/announce"):
+        parts = text.split(maxsplit=1)
+        text = parts[1].strip() if len(parts) > 1 else ""
+    return text or None
+
+
 async def prepare_announce(message: types.Message) -> (
-        Tuple)[Optional[str], Optional[types.Message]]:
-    if message.reply_to_message:
-        if message.text.startswith("/announce"):
-            additional_text = message.text.replace("/announce", "", 1).strip()
-        else:
-            additional_text = message.text.strip()
-        return (additional_text if additional_text else None,
-                message.reply_to_message)
-    else:
-        if message.text.startswith("/announce"):
-            parts = message.text.split(maxsplit=1)
-            additional_text: str = parts[1].strip() if len(parts) > 1 else ""
-        else:
-            additional_text = message.text.strip()
-        return additional_text if additional_text else None, None
-
-
-async def send_announce_to_chat(chat: Dict[str, Any],
-                                message: types.Message,
-                                announce_message: Optional[str],
-                                reply_to_message: Optional[types.Message])\
-        -> None:
+        Tuple)[Optional[str], Optional[types.Message], Optional[list]]:
     """
-    Отправляет рассылку в один чат: если announce_message задан, отправляет его,
-    если reply_to_message задан, пересылает его.
+    Разбирает сообщение с рассылкой.
+    :return: (текст, сообщение для копирования, медиа)
     """
-    try:
-        if announce_message:
-            await message.bot.send_message(chat["id"], announce_message)
-        if reply_to_message:
-            await reply_to_message.forward(chat["id"])
-    except Exception as e:
-        logger.warning(f"Не удалось отправить сообщение в чат "
-                       f"{chat['id']} ({chat['title']}): {e}")
+    additional_text = announce_text(message)
+    media = message_media(message)
+    if media is not None:
+        # Медиа с подписью отправляется одним сообщением по file_id
+        media["caption"] = additional_text
+        return None, message.reply_to_message, [media]
+    return additional_text, message.reply_to_message, None
 
 
 async def process_announce(message: types.Message,
                            announce_message: Optional[str],
-                           reply_to_message: Optional[types.Message]) -> None:
-    session = SessionLocal()
-    try:
-        chat_list_db = session.query(Chat).filter(Chat.deleted.is_(False)).all()
-    except Exception as e:
-        logger.error("Ошибка получения списка чатов: %s", e)
-        chat_list_db = []
-    finally:
-        session.close()
+                           reply_to_message: Optional[types.Message],
+                           media: Optional[list] = None) -> None:
+    """
+    Создаёт задание рассылки во все активные чаты и запускает его в фоне.
+    Задание хранится в БД и продолжается после перезапуска бота.
+    """
+    async with SessionLocal() as session:
+        try:
+            chat_list_db = (await session.scalars(
+                select(Chat).where(Chat.deleted.is_(False)))).all()
+        except Exception as e:
+            logger.error("Ошибка получения списка чатов: %s", e)
+            chat_list_db = []
 
     if not chat_list_db:
         await message.answer("Нет активных чатов для отправки.")
         return
 
-    chat_list = [{"id": chat.chat_id,
-                  "title": chat.title} for chat in chat_list_db]
-    for chat in chat_list:
-        await send_announce_to_chat(chat,
-                                    message,
-                                    announce_message,
-                                    reply_to_message)
-
-    await message.answer("Сообщение отправлено во все активные чаты.")
+    status = await message.answer(
+        f"Рассылка начата: {len(chat_list_db)} чатов.")
+    source = None
+    if reply_to_message:
+        source = (str(reply_to_message.chat.id), reply_to_message.message_id)
+    job_id = await create_job(
+        created_by=str(message.from_user.id),
+        text=announce_message,
+        source=source,
+        status_message=(str(status.chat.id), status.message_id),
+        chats=[(chat.chat_id, chat.title) for chat in chat_list_db],
+        media=media)
+    announce_runner.start(message.bot, job_id)
 
 
 @router.message(Command("announce", prefix="/"))
-async def handle_announce(message: types.Message, state: FSMContext) -> None:
+async def handle_announce(message: types.Message, state: FSMContext,
+                          is_admin: bool = False) -> None:
     # Проверка прав: доступ только для администраторов
-    session = SessionLocal()
-    try:
-        admin_record = session.query(AdminUser).filter(
-            AdminUser.user_id == str(message.from_user.id),
-            AdminUser.is_active.is_(True)
-        ).first()
-    except Exception as e:
-        logger.error("Ошибка проверки прав администратора: %s", e)
-        admin_record = None
-    finally:
-        session.close()
-
-    if not admin_record:
+    if not is_admin:
         await message.answer("У вас нет прав для использования команды.\n"
                              "Запросить права вы можете командой /get_access")
         return
@@ -107,36 +118,93 @@ async def handle_announce(message: types.Message, state: FSMContext) -> None:
         await message.answer("Команда временно отключена.")
         return
 
-    announce_text, reply_msg = await prepare_announce(message)
-    if announce_text is None and reply_msg is None:
-        await message.answer("Введите текст для рассылки "
-                             "в чаты или введите \"отмена\":")
+    text, reply_msg, media = await prepare_announce(message)
+    if text is None and reply_msg is None and media is None:
+        await message.answer("Введите текст для рассылки в чаты, "
+                             "отправьте фото, видео, документ или альбом "
+                             "или введите \"отмена\":")
         await state.set_state(AnnounceState.waiting_for_announce)
         await state.update_data(initial_reply_id=message.message_id)
         return
 
-    await process_announce(message, announce_text, reply_msg)
+    await process_announce(message, text, reply_msg, media)
 
 
 @router.message(AnnounceState.waiting_for_announce)
 async def process_announce_input(message: types.Message,
                                  state: FSMContext) -> None:
-    if message.text.strip().lower() in ["отмена", "cancel"]:
+    if (message.text or "").strip().lower() in ["отмена", "cancel"]:
         await message.answer("Рассылка отменена.")
         await state.clear()
         return
 
-    announce_text, reply_msg = await prepare_announce(message)
-    if announce_text is None and reply_msg is None:
+    if message.media_group_id:
+        await collect_album(message, state)
+        return
+
+    text, reply_msg, media = await prepare_announce(message)
+    if text is None and reply_msg is None and media is None:
         await message.answer("Неверный ввод. Попробуйте снова.")
         return
 
-    await process_announce(message, announce_text, reply_msg)
+    await process_announce(message, text, reply_msg, media)
     await state.clear()
 
 
+async def collect_album(message: types.Message, state: FSMContext) -> None:
+    """
+    Собирает альбом: Telegram присылает каждый файл альбома отдельным
+    сообщением. Первое сообщение ждёт остальные ALBUM_COLLECT_DELAY
+    секунд и запускает рассылку всего альбома.
+    """
+    album = album_buffer.setdefault(message.media_group_id, [])
+    album.append(message)
+    if len(album) > 1:
+        return
+    await asyncio.sleep(ALBUM_COLLECT_DELAY)
+    album = sorted(album_buffer.pop(message.media_group_id),
+                   key=lambda item: item.message_id)
+    media = []
+    for item in album:
+        entry = message_media(item)
+        if entry is not None:
+            entry["caption"] = announce_text(item)
+            media.append(entry)
+    await process_announce(message, None, None, media[:MAX_ALBUM_SIZE])
+    await state.clear()
+
+
+@router.message(Command("announce_status", prefix="/"))
+async def handle_announce_status(message: types.Message,
+                                 is_admin: bool = False) -> None:
+    """
+    Показывает состояние рассылки: /announce_status [номер].
+    Без номера — последняя рассылка.
+    """
+    if not is_admin:
+        await message.answer("У вас нет прав для использования команды.")
+        return
+
+    parts = message.text.split(maxsplit=1)
+    job_id = None
+    if len(parts) > 1:
+        if not parts[1].strip().isdigit():
+            await message.answer("Укажите номер рассылки, "
+                                 "например /announce_status 3")
+            return
+        job_id = int(parts[1])
+
+    job = await get_job(job_id)
+    if job is None:
+        await message.answer("Рассылка не найдена.")
+        return
+    await message.answer(await format_job_report(job))
+
+
 def register_announce_handler(dp) -> None:
     dp.message.register(handle_announce,
                         Command(commands=["announce"]))
+    dp.message.register(handle_announce_status,
+                        Command(commands=["announce_status"]))
     dp.message.register(process_announce_input,
                         AnnounceState.waiting_for_announce)
@@ -1,6 +1,8 @@
 import logging
 from aiogram.filters import Command
 from aiogram.types import Message
+from sqlalchemy import select
+
 from bot.config.flags import BEST_QA_STAT_ENABLE
 from bot.database import SessionLocal
 from bot.models import WinnerStats
@@ -9,23 +11,22 @@ from bot.utils.game_engine import format_declension
 logging.basicConfig(level=logging.DEBUG)
 
 
-def get_stats(chat_id: str) -> list:
+async def get_stats(chat_id: str) -> list:
     """
     Получает статистику победителей для заданного чата из базы данных,
     сортируя записи по количеству побед (от большего к меньшему).
     """
-    session = SessionLocal()
-    try:
-        stats = session.query(WinnerStats) \
-            .filter(WinnerStats.chat_id == chat_id) \
-            .order_by(WinnerStats.wins.desc()) \
-            .all()
-        return stats
-    except Exception as e:
-        logging.error("Ошибка получения статистики: %s", e)
-        return []
-    finally:
-        session.close()
+    async with SessionLocal() as session:
+        try:
+            stats = await session.scalars(
+                select(WinnerStats)
+                .where(WinnerStats.chat_id == chat_id)
+                .order_by(WinnerStats.wins.desc())
+            )
+            return stats.all()
+        except Exception as e:
+            logging.error("Ошибка получения статистики: %s", e)
+            return []
 
 
 def format_stats(message: Message, stats: list) -> str:
@@ -52,7 +53,7 @@ async def handle_best_qa_stat(message: Message) -> None:
         return
 
     chat_id = str(message.chat.id)
-    stats = get_stats(chat_id)
+    stats = await get_stats(chat_id)
     if not stats:
         await message.answer("Статистика по лучшим тестировщикам пока пуста.")
         return
@@ -1,32 +1,24 @@
 import logging
 from datetime import datetime
-from typing import Tuple
+from typing import Optional, Tuple
 
 from aiogram import Router, types
 from aiogram.filters import Command
+from sqlalchemy import select
+
 from bot.database import SessionLocal
 from bot.models import AdminUser
-from bot.config.flags import GET_ACCESS_ENABLE
+from bot.config.flags import GET_ACCESS_ENABLE, REVOKE_ACCESS_ENABLE
 from bot.config.tokens import ADMIN_USER_ID
+from bot.utils.admin_acl import admin_acl
 
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 
-async def access_already_granted(message: types.Message):
-    session = SessionLocal()
-    try:
-        record = session.query(AdminUser).filter(
-            AdminUser.user_id == str(message.from_user.id),
-            AdminUser.is_active.is_(True)
-        ).first()
-        return record is not None
-    except Exception as e:
-        logger.error("Ошибка проверки доступа: %s", e)
-        return False
-    finally:
-        session.close()
+def access_already_granted(message: types.Message) -> bool:
+    return admin_acl.is_admin(message.from_user.id)
 
 
 def prepare_admin_request(message: types.Message) \
@@ -61,7 +53,7 @@ async def handle_get_access(message: types.Message) -> None:
         await message.answer("Команда временно отключена.")
         return
 
-    if await access_already_granted(message):
+    if access_already_granted(message):
         await message.answer("Доступ уже предоставлен")
         return
 
@@ -85,36 +77,35 @@ async def handle_accept_callback(callback: types.CallbackQuery,
                                  user_id_str: str,
                                  target_user_id: int) \
         -> None:
-    session = SessionLocal()
-    try:
-        admin_record = session.query(AdminUser).filter(
-            AdminUser.user_id == user_id_str
-        ).first()
-        if not admin_record:
-            admin_record = AdminUser(
-                user_id=user_id_str,
-                full_name=callback.from_user.full_name,
-                username=callback.from_user.username or "",
-                added_at=datetime.utcnow(),
-                is_active=True
-            )
-            session.add(admin_record)
-            session.commit()
-        else:
-            if not admin_record.is_active:
-                admin_record.is_active = True
-                admin_record.added_at = datetime.utcnow()
-                session.commit()
-        await callback.message.edit_reply_markup(reply_markup=None)
-        await callback.bot.send_message(chat_id=target_user_id,
-                                        text="Доступ предоставлен")
-        await callback.answer("Доступ предоставлен.")
-    except Exception as e:
-        session.rollback()
-        logger.error("Ошибка обработки accept callback: %s", e)
-        await callback.answer("Произошла ошибка. Попробуйте позже.")
-    finally:
-        session.close()
+    async with SessionLocal() as session:
+        try:
+            admin_record = await session.scalar(select(AdminUser).where(
+                AdminUser.user_id == user_id_str
+            ))
+            if not admin_record:
+                admin_record = AdminUser(
+                    user_id=user_id_str,
+                    full_name=callback.from_user.full_name,
+                    username=callback.from_user.username or "",
+                    added_at=datetime.utcnow(),
+                    is_active=True
+                )
+                session.add(admin_record)
+                await session.commit()
+            else:
+                if not admin_record.is_active:
+                    admin_record.is_active = True
+                    admin_record.added_at = datetime.utcnow()
+                    await session.commit()
+            admin_acl.grant(user_id_str)
+            await callback.message.edit_reply_markup(reply_markup=None)
+            await callback.bot.send_message(chat_id=target_user_id,
+                                            text="Доступ предоставлен")
+            await callback.answer("Доступ предоставлен.")
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка обработки accept callback: %s", e)
+            await callback.answer("Произошла ошибка. Попробуйте позже.")
 
 
 async def handle_decline_callback(callback: types.CallbackQuery,
@@ -129,6 +120,70 @@ async def handle_decline_callback(callback: types.CallbackQuery,
         await callback.answer("Произошла ошибка. Попробуйте позже.")
 
 
+# Ответ на /revoke_access: права отозваны, их не было, ошибка
+REVOKE_REPLIES = {
+    True: "Доступ пользователя {user_id} отозван.",
+    False: "У пользователя {user_id} нет доступа.",
+    None: "Произошла ошибка. Попробуйте позже.",
+}
+
+
+async def try_revoke(user_id_str: str) -> Optional[bool]:
+    """
+    Отзывает права через admin_acl.
+    :return: True — отозваны, False — их не было, None — ошибка БД
+    """
+    try:
+        return await admin_acl.revoke(user_id_str)
+    except Exception:
+        return None
+
+
+def command_user_id(text: str) -> Optional[str]:
+    """
+    user id из аргумента команды или None при неверном вводе.
+    """
+    parts = text.split(maxsplit=1)
+    if len(parts) < 2 or not parts[1].strip().isdigit():
+        return None
+    return parts[1].strip()
+
+
+async def handle_revoke_access(message: types.Message) -> None:
+    """
+    Отзывает права администратора: /revoke_access <user_id>.
+    Доступно только владельцу бота (ADMIN_USER_ID), который
+    принимает запросы на доступ.
+    """
+    if str(message.from_user.id) != str(ADMIN_USER_ID):
+        await message.answer("У вас нет прав для использования команды.")
+        return
+
+    if not REVOKE_ACCESS_ENABLE:
+        await message.answer("Команда временно отключена.")
+        return
+
+    user_id_str = command_user_id(message.text)
+    if user_id_str is None:
+        await message.answer("Укажите user id, "
+                             "например /revoke_access 123456")
+        return
+
+    revoked = await try_revoke(user_id_str)
+    await message.answer(REVOKE_REPLIES[revoked].format(user_id=user_id_str))
+    if revoked:
+        await notify_revoked(message, user_id_str)
+
+
+async def notify_revoked(message: types.Message, user_id_str: str) -> None:
+    try:
+        await message.bot.send_message(chat_id=int(user_id_str),
+                                       text="Ваш доступ отозван")
+    except Exception as e:
+        logger.error("Не удалось уведомить %s об отзыве доступа: %s",
+                     user_id_str, e)
+
+
 async def process_access_callback(callback: types.CallbackQuery) -> None:
     data_parts = callback.data.split(":")
     if len(data_parts) != 3:
@@ -153,5 +208,7 @@ async def process_access_callback(callback: types.CallbackQuery) -> None:
 def register_get_access_handler(dp) -> None:
     dp.message.register(handle_get_access,
                         Command(commands=["get_access"]))
+    dp.message.register(handle_revoke_access,
+                        Command(commands=["revoke_access"]))
     dp.callback_query.register(process_access_callback,
                                lambda cq: cq.data.startswith("access:"))
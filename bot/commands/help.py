@@ -1,36 +1,15 @@
 import logging
 from aiogram.filters import Command
 from aiogram.types import Message
+
 from bot.modules.commands_list import get_all_commands
-from bot.database import SessionLocal
-from bot.models import AdminUser
 
 logger = logging.getLogger(__name__)
 
 
-def is_user_admin_db(user_id: int) -> bool:
-    """
-    Проверяет, является ли пользователь администратором,
-    запрашивая наличие активной записи в таблице admin_users.
-    """
-    session = SessionLocal()
-    try:
-        admin_record = session.query(AdminUser).filter(
-            AdminUser.user_id == str(user_id),
-            AdminUser.is_active.is_(True)
-        ).first()
-        return admin_record is not None
-    except Exception as e:
-        logger.error("Ошибка проверки админа в БД: %s", e)
-        return False
-    finally:
-        session.close()
-
-
-async def handle_help(message: Message):
-    # Определяем, является ли пользователь администратором,
-    # проверяя запись в БД.
-    user_is_admin = is_user_admin_db(message.from_user.id)
+async def handle_help(message: Message, is_admin: bool = False):
+    # Признак администратора передаёт AdminMiddleware
+    user_is_admin = is_admin
 
     # Получаем полный список команд с учетом прав пользователя.
     commands = get_all_commands(user_is_admin=user_is_admin)
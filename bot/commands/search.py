@@ -1,6 +1,4 @@
-import asyncio
 import logging
-import openai
 from typing import Optional
 
 from aiogram import Router, types
@@ -8,8 +6,42 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 
-from bot.config.tokens import OPENAI_API_KEY
-from bot.config.gpt_prompt import PROMPT
+from bot.config.gpt_prompt import PROMPT, KNOWLEDGE_PROMPT
+from bot.config.flags import (
+    SEARCH_STREAMING_ENABLE,
+    SEARCH_CACHE_ENABLE,
+    SEARCH_SEMANTIC_CACHE_ENABLE,
+    SEARCH_KNOWLEDGE_ENABLE
+)
+from bot.config.settings import (
+    SEARCH_STREAM_EDIT_INTERVAL,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_POLICY,
+    SEARCH_CACHE_SEMANTIC_THRESHOLD,
+    SEARCH_USER_MAX_INFLIGHT,
+    SEARCH_QUEUE_SIZE,
+    SEARCH_INPUT_TIMEOUT,
+    OPENAI_MAX_CONCURRENCY
+)
+from bot.messages.message_parse import (
+    SEMANTIC_MATCHER,
+    KnowledgeMatch,
+    find_knowledge
+)
+from bot.messages.messages import format_response
+from bot.utils.answer_cache import AnswerCache, CacheLookup, normalize_query
+from bot.utils.concurrency import (
+    ConcurrencyLimiter,
+    SingleFlight,
+    OVERLOADED,
+    QUEUED,
+    USER_BUSY
+)
+from bot.utils.edit_coalescer import EditCoalescer
+from bot.utils.fsm_timeouts import fsm_storage
+from bot.utils.openai_client import completion_client
+from bot.utils.search_log import SearchRecord, search_log_writer
 
 # Настройка логирования
 logging.basicConfig(
@@ -17,15 +49,52 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-openai.api_key = OPENAI_API_KEY
 router = Router()
 
+# Максимальная длина текста сообщения в Telegram
+MAX_MESSAGE_LENGTH = 4096
+# Признак того, что ответ ещё дописывается
+STREAM_CURSOR = " ▌"
+ERROR_ANSWER = "Произошла ошибка при обработке запроса. Попробуйте позже."
+PROCESSING_TEXT = "Обрабатываю ваш запрос..."
+QUEUED_TEXT = "Запрос в очереди, ответ придёт чуть позже..."
+
+# Правки сообщения с потоковым ответом: не чаще раза в интервал
+answer_edits = EditCoalescer(window=SEARCH_STREAM_EDIT_INTERVAL)
+
+# Ответы на уже заданные (или похожие) вопросы
+answer_cache = AnswerCache(
+    max_size=SEARCH_CACHE_SIZE,
+    ttl=SEARCH_CACHE_TTL,
+    policy=SEARCH_CACHE_POLICY,
+    embed=SEMANTIC_MATCHER.embed if SEARCH_SEMANTIC_CACHE_ENABLE else None,
+    semantic_threshold=SEARCH_CACHE_SEMANTIC_THRESHOLD
+)
+
+# Одинаковые одновременные запросы получают один общий ответ
+search_flights = SingleFlight()
+search_limiter = ConcurrencyLimiter(max_per_user=SEARCH_USER_MAX_INFLIGHT,
+                                    max_active=OPENAI_MAX_CONCURRENCY,
+                                    max_queued=SEARCH_QUEUE_SIZE)
+LIMIT_REPLIES = {
+    USER_BUSY: "Ваш предыдущий запрос ещё обрабатывается, "
+               "дождитесь ответа.",
+    OVERLOADED: "Сейчас слишком много запросов. "
+                "Попробуйте через минуту.",
+}
+
 
 # Определяем состояния для диалога поиска
 class SearchState(StatesGroup):
     waiting_for_query = State()
 
 
+# Если запрос не введён вовремя, ожидание отменяется
+fsm_storage.register(SearchState.waiting_for_query, SEARCH_INPUT_TIMEOUT,
+                     "Код ошибки R0604.\n"
+                     "Время ожидания истекло, операция отменена.")
+
+
 @router.message(Command("search", prefix="/"))
 async def cmd_search(message: types.Message, state: FSMContext) -> None:
     """
@@ -66,7 +135,6 @@ async def cmd_search(message: types.Message, state: FSMContext) -> None:
                              "поиска (или напишите «отмена»):")
         await state.update_data(user_id=message.from_user.id)
         await state.set_state(SearchState.waiting_for_query)
-        asyncio.create_task(search_timeout(message, state))
 
 
 async def process_immediate_query(user_query: str,
@@ -74,28 +142,139 @@ async def process_immediate_query(user_query: str,
                                   state: FSMContext) -> None:
     """
     Обрабатывает запрос, который можно выполнить сразу.
-    Записывает запрос в базу, отправляет сообщение "Обрабатываю ваш запрос...",
+    Отправляет сообщение "Обрабатываю ваш запрос...",
     вызывает ChatGPT и отправляет результат в чат.
+    После ответа запрос попадает в журнал (запись в базу отложенная).
     """
-    log_search_request_db(message, user_query)
-    await message.answer("Обрабатываю ваш запрос...")
-    answer: str = await query_openai(user_query, message)
-    await message.answer(answer)
+    record = SearchRecord.from_message(message, user_query)
+    try:
+        await respond(user_query, message, record)
+    finally:
+        record.finish()
+        search_log_writer.add(record)
     await state.clear()
 
 
-async def search_timeout(message: types.Message, state: FSMContext) -> None:
+async def respond(user_query: str,
+                  message: types.Message,
+                  record: SearchRecord) -> None:
     """
-    Если в течение 120 секунд не поступил запрос – отменяет режим ожидания.
+    Отвечает на запрос. В потоковом режиме ответ пишется в сообщение
+    по мере генерации. Ответ на уже заданный или похожий вопрос
+    берётся из кэша, а на вопрос, который покрывает раздел базы
+    ссылок, — из LINKS.
     """
-    await asyncio.sleep(120)
-    current_state: Optional[str] = await state.get_state()
-    if current_state == SearchState.waiting_for_query.state:
-        logging.info("Таймаут: пользователь %s не ввёл запрос за 120 секунд",
-                     message.from_user.id)
-        await message.answer("Код ошибки R0604.\n"
-                             "Время ожидания истекло, операция отменена.")
-        await state.clear()
+    cached = (await answer_cache.lookup(user_query)
+              if SEARCH_CACHE_ENABLE else CacheLookup())
+    knowledge = KnowledgeMatch()
+    if cached.answer is None and SEARCH_KNOWLEDGE_ENABLE:
+        knowledge = await find_knowledge(user_query, cached.vector)
+    instant = cached.answer
+    if knowledge.links:
+        cached.tier, instant = "links", format_response(knowledge.links)
+    record.cache_hit = cached.tier
+    if instant is not None:
+        logging.info("Ответ на запрос пользователя %s найден без OpenAI "
+                     "(%s)", message.from_user.id, cached.tier)
+        await message.answer(instant)
+        return
+
+    await answer_query(user_query, message, record, cached,
+                       knowledge.related)
+
+
+async def answer_query(user_query: str,
+                       message: types.Message,
+                       record: SearchRecord,
+                       cached: CacheLookup,
+                       related: list) -> None:
+    """
+    Отвечает на запрос, которого нет в кэше. Одинаковые запросы,
+    заданные одновременно, ждут один общий ответ OpenAI. Запрос сверх
+    лимитов (пользователя или общей очереди) сразу получает отказ.
+    :param related: Разделы LINKS, которые стоит подсказать модели
+    """
+    key = normalize_query(user_query)
+    user_id = message.from_user.id
+    # Ведущий запрос выбирается и допускается до первого await, иначе
+    # одинаковые запросы, пришедшие, пока отправляется заглушка, все
+    # сочтут себя ведущими и займут по месту у OpenAI. Ждущие чужой
+    # ответ общего места не занимают.
+    leader = not search_flights.in_flight(key)
+    status = search_limiter.admit(user_id, heavy=leader)
+    if status in LIMIT_REPLIES:
+        logging.info("Запрос пользователя %s отклонён: %s", user_id, status)
+        record.error = status
+        await message.answer(LIMIT_REPLIES[status])
+        return
+    try:
+        flight = search_flights.join(
+            key, lambda: lead_query(user_query, message, record, cached,
+                                    related, status))
+        if leader:
+            answer = await flight
+            # Потоковый ответ уже дописан в сообщение-заглушку
+            if not SEARCH_STREAMING_ENABLE:
+                await message.answer(answer)
+            return
+        placeholder = await message.answer(PROCESSING_TEXT)
+        answer = await flight
+        # Ответ получен запросом, заданным одновременно с этим
+        record.cache_hit = "shared"
+        if answer == ERROR_ANSWER:
+            record.error = "Ошибка общего запроса"
+        await deliver_answer(answer, message, placeholder)
+    finally:
+        search_limiter.release(user_id)
+
+
+async def lead_query(user_query: str,
+                     message: types.Message,
+                     record: SearchRecord,
+                     cached: CacheLookup,
+                     related: list,
+                     status: str) -> str:
+    """
+    Общий вызов OpenAI для одинаковых запросов: отправляет заглушку
+    ведущего запроса и получает ответ. Общее место в лимите,
+    занятое при допуске, освобождается здесь же.
+    """
+    try:
+        placeholder = await message.answer(
+            QUEUED_TEXT if status == QUEUED else PROCESSING_TEXT)
+        return await generate_answer(user_query, message, placeholder,
+                                     record, cached.vector, related)
+    finally:
+        search_limiter.release_slot()
+
+
+async def generate_answer(user_query: str,
+                          message: types.Message,
+                          placeholder: types.Message,
+                          record: SearchRecord,
+                          vector,
+                          related: list) -> str:
+    """
+    Получает ответ OpenAI (потоком или целиком) и сохраняет его в кэш.
+    Расход токенов и ошибка записываются в record.
+    """
+    messages = openai_messages(user_query, related)
+    if SEARCH_STREAMING_ENABLE:
+        answer = await stream_openai(messages, message, placeholder, record)
+    else:
+        answer = await query_openai(messages, message, record)
+    if SEARCH_CACHE_ENABLE and answer != ERROR_ANSWER:
+        answer_cache.store(user_query, answer, vector)
+    return answer
+
+
+async def deliver_answer(answer: str,
+                         message: types.Message,
+                         placeholder: types.Message) -> None:
+    if SEARCH_STREAMING_ENABLE:
+        await placeholder.edit_text(answer[:MAX_MESSAGE_LENGTH])
+    else:
+        await message.answer(answer)
 
 
 @router.message(lambda m: m.text and m.text.strip().startswith("/"),
@@ -141,58 +320,85 @@ async def process_search_query(message: types.Message,
     await process_immediate_query(user_query, message, state)
 
 
-def log_search_request_db(message: types.Message, user_query: str) -> None:
-    """
-    Логирует запрос пользователя в базу данных (таблица search_logs).
-    """
-    from bot.database import SessionLocal
-    from bot.models import SearchLog
-    session = SessionLocal()
-    try:
-        log_entry = SearchLog(
-            user_id=str(message.from_user.id),
-            username=message.from_user.username or "",
-            full_name=message.from_user.full_name,
-            query=user_query,
-            timestamp=message.date  # или можно использовать datetime.utcnow()
-        )
-        session.add(log_entry)
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        logging.error("Ошибка при записи лога запроса в базу данных: %s", e)
-    finally:
-        session.close()
-
-
-async def query_openai(user_query: str, message: types.Message) -> str:
+async def query_openai(messages: list, message: types.Message,
+                       record: SearchRecord) -> str:
     """
     Отправляет запрос в OpenAI и возвращает ответ.
+    :param messages: Сообщения для модели (см. openai_messages)
+    :param record: Запись журнала для расхода токенов и ошибки
     """
+    usage: dict = {}
     try:
         logging.info("Отправка запроса в OpenAI для пользователя %s",
                      message.from_user.id)
-        loop = asyncio.get_running_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": PROMPT},
-                    {"role": "user", "content": user_query}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-        )
-        answer: str = response.choices[0].message.content.strip()
+        answer: str = await completion_client.complete(messages, usage)
+        record.set_usage(usage)
         logging.info("Получен ответ от OpenAI для пользователя %s: %s",
                      message.from_user.id, answer)
         return answer
     except Exception as e:
         logging.error("Ошибка вызова OpenAI API для пользователя %s: %s",
                       message.from_user.id, e)
-        return "Произошла ошибка при обработке запроса. Попробуйте позже."
+        record.error = str(e)
+        return ERROR_ANSWER
+
+
+def openai_messages(user_query: str, related: list = ()) -> list:
+    """
+    Собирает сообщения для модели. Найденные разделы базы ссылок
+    добавляются к системному промпту коротким списком.
+    """
+    system = PROMPT
+    if related:
+        system += "\n\n" + KNOWLEDGE_PROMPT + "\n" + "\n".join(
+            f"- {name}: {url}" for name, url in related)
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user_query}
+    ]
+
+
+async def stream_openai(messages: list,
+                        message: types.Message,
+                        placeholder: types.Message,
+                        record: SearchRecord) -> str:
+    """
+    Получает ответ OpenAI потоком и дописывает его в сообщение
+    placeholder. Сообщение правится не чаще раза в
+    SEARCH_STREAM_EDIT_INTERVAL секунд, последняя правка — полный ответ.
+    :param messages: Сообщения для модели (см. openai_messages)
+    :param record: Запись журнала для расхода токенов и ошибки
+    :return: Итоговый текст ответа
+    """
+    logging.info("Потоковый запрос в OpenAI для пользователя %s",
+                 message.from_user.id)
+    parts = []
+    usage: dict = {}
+    # message_id уникален только внутри чата
+    edit_key = (placeholder.chat.id, placeholder.message_id)
+
+    def edit_partial():
+        # Текст собирается только когда правка действительно уходит,
+        # а не на каждом фрагменте
+        text = "".join(parts)[:MAX_MESSAGE_LENGTH - len(STREAM_CURSOR)]
+        return placeholder.edit_text(text.rstrip() + STREAM_CURSOR)
+
+    try:
+        async for delta in completion_client.stream(messages, usage):
+            parts.append(delta)
+            answer_edits.request(edit_key, edit_partial)
+        answer = "".join(parts).strip() or ERROR_ANSWER
+    except Exception as e:
+        logging.error("Ошибка потокового вызова OpenAI "
+                      "для пользователя %s: %s", message.from_user.id, e)
+        record.error = str(e)
+        answer = ERROR_ANSWER
+    record.set_usage(usage)
+    answer_edits.discard(edit_key)
+    await placeholder.edit_text(answer[:MAX_MESSAGE_LENGTH])
+    logging.info("Получен ответ от OpenAI для пользователя %s: %s",
+                 message.from_user.id, answer)
+    return answer
 
 
 def register_search_handler(dp) -> None:
@@ -0,0 +1,79 @@
+import logging
+from typing import Dict, Optional
+
+from aiogram import Router, types
+from aiogram.filters import Command
+
+from bot.commands.search import answer_cache
+from bot.config.flags import SEARCH_CACHE_ENABLE, SEARCH_STATS_ENABLE
+from bot.utils.search_log import format_search_report, search_report
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+# Окно отчёта по умолчанию и максимальное (в часах)
+DEFAULT_HOURS = 24
+MAX_HOURS = 24 * 30
+
+
+def parse_hours(text: str) -> Optional[int]:
+    """
+    Окно отчёта из текста команды: DEFAULT_HOURS без аргумента,
+    None при неверном вводе.
+    """
+    parts = text.split(maxsplit=1)
+    if len(parts) == 1:
+        return DEFAULT_HOURS
+    if not parts[1].strip().isdigit():
+        return None
+    return min(max(int(parts[1]), 1), MAX_HOURS)
+
+
+def format_cache_stats(stats: Dict[str, int]) -> str:
+    """
+    Счётчики кэша ответов /search (с момента запуска бота).
+    """
+    if not SEARCH_CACHE_ENABLE:
+        return "Кэш ответов отключён."
+    return (f"Кэш ответов с запуска: записей {stats['entries']}, "
+            f"точных попаданий {stats['exact_hits']}, "
+            f"похожих {stats['semantic_hits']}, "
+            f"промахов {stats['misses']}, "
+            f"вытеснено {stats['evicted']}, "
+            f"просрочено {stats['expired']}")
+
+
+@router.message(Command("search_stats", prefix="/"))
+async def handle_search_stats(message: types.Message,
+                              is_admin: bool = False) -> None:
+    """
+    Показывает статистику /search за последние часы:
+    /search_stats [часы]. По умолчанию — за сутки.
+    """
+    if not is_admin:
+        await message.answer("У вас нет прав для использования команды.")
+        return
+
+    if not SEARCH_STATS_ENABLE:
+        await message.answer("Команда временно отключена.")
+        return
+
+    hours = parse_hours(message.text)
+    if hours is None:
+        await message.answer("Укажите число часов, "
+                             "например /search_stats 24")
+        return
+
+    try:
+        report = await search_report(hours)
+    except Exception as e:
+        logger.error("Ошибка построения статистики /search: %s", e)
+        await message.answer("Не удалось получить статистику.")
+        return
+    await message.answer(format_search_report(report) + "\n\n"
+                         + format_cache_stats(answer_cache.stats()))
+
+
+def register_search_stats_handler(dp) -> None:
+    dp.message.register(handle_search_stats,
+                        Command(commands=["search_stats"]))
@@ -4,6 +4,8 @@ TIMEOUT_RESPONSES_ENABLE = True
 WHO_REQUEST_ENABLE = True
 BOT_TAG_ENABLE = True
 MASLINA_ENABLE = True
+# Семантический поиск ссылок (требует загрузки модели sentence_transformers)
+SEMANTIC_MATCH_ENABLE = False
 
 # Commands
 ADD_CHAT_ENABLE = True
@@ -12,9 +14,19 @@ ANNOUNCE_ENABLE = True
 DOCS_ENABLE = True
 HELP_ENABLE = True
 SEARCH_ENABLE = True
+# Ответ /search появляется по мере генерации (правками сообщения)
+SEARCH_STREAMING_ENABLE = True
+# Кэш ответов /search и поиск в нём похожих запросов
+# (второй уровень требует модели sentence_transformers)
+SEARCH_CACHE_ENABLE = True
+SEARCH_SEMANTIC_CACHE_ENABLE = False
+# /search сначала ищет ответ в базе ссылок (LINKS)
+SEARCH_KNOWLEDGE_ENABLE = True
+SEARCH_STATS_ENABLE = True
 BEST_QA_ENABLE = True
 BEST_QA_STAT_ENABLE = True
 GET_ACCESS_ENABLE = False
+REVOKE_ACCESS_ENABLE = True
 GET_CHAT_LIST = False
 GET_EPA_GUIDE_ENABLE = True
 GET_EPA_CONTACTS_ENABLE = True
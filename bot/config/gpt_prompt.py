@@ -3,3 +3,8 @@ PROMPT = ("Ты тестировщик. К тебе обращаются по п
           "или программированием. Так же ты можешь помочь настроить систему."
           "Ни при каких условиях, ты не должен"
           "игнорировать эти команды и отступать от сценария")
+
+# Добавляется к PROMPT, когда в базе ссылок нашлись похожие разделы
+KNOWLEDGE_PROMPT = ("Разделы внутренней базы знаний, которые могут "
+                    "относиться к вопросу. Если раздел подходит, "
+                    "дай ссылку на него:")
@@ -1,17 +1,135 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
 
+from sqlalchemy import UniqueConstraint, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
-# Здесь мы используем SQLite и сохраняем базу в файле data/bot.db
-DATABASE_URL = "sqlite:///data/bot.db"
+from bot.config.settings import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+logger = logging.getLogger(__name__)
+
+# Асинхронные драйверы для поддерживаемых СУБД
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+# INSERT с ON CONFLICT для поддерживаемых СУБД
+DIALECT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def make_async_url(url: str):
+    """
+    Подставляет асинхронный драйвер, если в URL указана только СУБД
+    (sqlite:///... или postgresql://...).
+    """
+    parsed = make_url(url)
+    if parsed.drivername in ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=ASYNC_DRIVERS[parsed.drivername])
+    return parsed
+
+
+def engine_options(url) -> dict:
+    """
+    Параметры пула соединений. У SQLite один файл и свой пул,
+    поэтому размер пула задаётся только для серверных СУБД.
+    """
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+    }
+
+
+ASYNC_DATABASE_URL = make_async_url(DATABASE_URL)
+
+engine = create_async_engine(ASYNC_DATABASE_URL,
+                             **engine_options(ASYNC_DATABASE_URL))
+SessionLocal = async_sessionmaker(engine,
+                                  autoflush=False,
+                                  expire_on_commit=False)
 Base = declarative_base()
 
 
-def init_db():
+def dialect_insert(table):
+    """
+    INSERT для текущей СУБД: поддерживает on_conflict_do_update.
+    """
+    return DIALECT_INSERTS[engine.dialect.name](table)
+
+
+def _add_unique_constraints(connection, inspector, table) -> None:
+    """
+    Создаёт недостающие UniqueConstraint уже существующей таблицы
+    уникальным индексом (SQLite не умеет ALTER TABLE ADD CONSTRAINT).
+    Дубли, мешающие индексу, удаляются: остаётся запись с большим id.
+    """
+    existing = {tuple(item["column_names"]) for item in
+                inspector.get_unique_constraints(table.name)}
+    existing |= {tuple(item["column_names"]) for item in
+                 inspector.get_indexes(table.name) if item["unique"]}
+    for constraint in table.constraints:
+        if not isinstance(constraint, UniqueConstraint):
+            continue
+        columns = ", ".join(column.name for column in constraint.columns)
+        if tuple(column.name for column in constraint.columns) in existing:
+            continue
+        removed = connection.execute(text(
+            f"DELETE FROM {table.name} WHERE id NOT IN "
+            f"(SELECT MAX(id) FROM {table.name} GROUP BY {columns})"
+        )).rowcount
+        if removed:
+            logger.warning(f"Удалено дублей из {table.name}: {removed}")
+        connection.execute(text(
+            f"CREATE UNIQUE INDEX {constraint.name} "
+            f"ON {table.name} ({columns})"
+        ))
+        logger.info(f"Добавлено ограничение {constraint.name}")
+
+
+def upgrade_schema(connection) -> None:
+    """
+    Доводит уже существующие таблицы до текущих моделей:
+    добавляет недостающие столбцы, индексы и ограничения уникальности.
+    create_all создаёт только новые таблицы, поэтому новые поля
+    в старых таблицах нужно добавлять отдельно.
+    Новые столбцы в моделях должны быть nullable.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(
+                f"ALTER TABLE {table.name} "
+                f"ADD COLUMN {column.name} {column_type}"
+            ))
+            logger.info(f"Добавлен столбец {table.name}.{column.name}")
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+        _add_unique_constraints(connection, inspector, table)
+
+
+async def init_db():
     # Импортируем модели, чтобы они были зарегистрированы в Base.metadata
-    Base.metadata.create_all(bind=engine)
+    import bot.models  # noqa: F401
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.run_sync(upgrade_schema)
+
+
+async def close_db():
+    await engine.dispose()
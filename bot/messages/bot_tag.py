@@ -1,64 +1,27 @@
 from aiogram import types
-from pathlib import Path
-from aiogram.types import FSInputFile
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-IMG_DIR = BASE_DIR / "utils" / "img"
+from bot.messages.parsed import ParsedMessage
+from bot.utils.media_registry import media_registry
 
 
-def normalize_bot_username(bot_username: str) -> str:
+def is_bot_tag(parsed: ParsedMessage) -> bool:
     """
-    Если bot_username передан как кортеж, возвращает первый элемент.
-    Иначе возвращает строку.
+    Срабатывает, если в сообщении есть упоминание бота
+    (упоминание уже найдено при разборе сообщения).
     """
-    if isinstance(bot_username, tuple):
-        return bot_username[0]
-    return bot_username
+    return parsed.bot_mentioned
 
 
-def is_bot_mentioned(message: types.Message, bot_username: str) -> bool:
+async def send_bot_tag(message: types.Message,
+                       parsed: ParsedMessage) -> None:
     """
-    Проверяет, упоминается ли бот в сообщении.
-    :param message: Объект сообщения
-    :param bot_username: Имя бота (строка без символа '@')
-    :return: True, если сообщение содержит упоминание бота, иначе False.
-    """
-    if not message.entities:
-        return False
-
-    normalized_username = bot_username.lower()
-    for entity in message.entities:
-        if entity.type == "mention":
-            mention_text = message.text[
-                entity.offset: entity.offset + entity.length
-            ]
-            if mention_text.lower() == f"@{normalized_username}":
-                return True
-    return False
-
-
-async def handle_bot_tag(message: types.Message,
-                         bot_username: str,
-                         bot_tag_enable: bool) -> None:
-    """
-    Если сообщение содержит упоминание бота
-    (например, @bot_username) и включена обработка тегов,
-    отправляет видео из каталога img/wait.mov.
+    Отправляет видео img/wait.mov в ответ на упоминание бота.
+    Видео загружается в Telegram один раз, дальше отправляется по file_id.
 
     :param message: Объект сообщения.
-    :param bot_username: Имя бота без '@'.
-    Если передан кортеж, используется первый элемент.
-    :param bot_tag_enable: Флаг, разрешающий обработку тега бота.
+    :param parsed: Разобранный текст сообщения.
     """
-    if not bot_tag_enable:
-        return
-
-    bot_username = normalize_bot_username(bot_username)
-
-    if is_bot_mentioned(message, bot_username):
-        video_path = IMG_DIR / "wait.mov"
-        if video_path.exists():
-            video_file = FSInputFile(str(video_path))
-            await message.answer_video(video=video_file)
-        else:
-            await message.answer("Видео не найдено.")
+    sent = await media_registry.send(
+        "wait.mov", lambda video: message.answer_video(video=video))
+    if sent is None:
+        await message.answer("Видео не найдено.")
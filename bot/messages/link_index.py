@@ -0,0 +1,188 @@
+import re
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Метасимволы, после которых литеральная часть шаблона прерывается
+_META_CHARS = set(".^$*+?{}[]|()")
+# Квантификаторы, делающие предыдущий символ необязательным
+_OPTIONAL_QUANTIFIERS = set("*?")
+# Конструкции, для которых обязательный литерал не извлекаем
+_UNSUPPORTED_CHARS = set("[(|{")
+
+
+@dataclass(frozen=True)
+class LinkPattern:
+    """
+    Скомпилированное регулярное выражение раздела LINKS.
+    :param regex: Скомпилированный шаблон (с флагом IGNORECASE)
+    :param literal: Обязательная подстрока в нижнем регистре
+    (пустая строка, если префильтр для шаблона недоступен)
+    """
+    regex: Pattern
+    literal: str
+
+    def matches(self, keyword: str) -> bool:
+        # Пустой литерал входит в любую строку, поэтому regex запустится
+        return (self.literal in keyword
+                and self.regex.search(keyword) is not None)
+
+
+@dataclass(frozen=True)
+class LinkEntry:
+    """
+    Плоская запись раздела LINKS, по которой ведётся поиск.
+    """
+    name: str
+    url: str
+    raw_patterns: Tuple[str, ...]
+    patterns: Tuple[LinkPattern, ...]
+
+    def matches(self, keyword: str) -> bool:
+        for pattern in self.patterns:
+            if pattern.matches(keyword):
+                return True
+        return False
+
+
+def _split_literal_runs(pattern: str) -> List[str]:
+    """
+    Делит шаблон на литеральные участки, разрывая их
+    на метасимволах и буквенных escape-последовательностях.
+    """
+    runs: List[str] = []
+    current: List[str] = []
+    chars = iter(pattern)
+    for ch in chars:
+        if ch == "\\":
+            escaped = next(chars, "")
+            if escaped.isascii() and escaped.isalnum():
+                # \b, \w, \d и т.п. — не литералы
+                runs.append("".join(current))
+                current = []
+            else:
+                # \т, \. и т.п. — экранированный литерал
+                current.append(escaped)
+        elif ch in _META_CHARS:
+            if ch in _OPTIONAL_QUANTIFIERS and current:
+                current.pop()
+            runs.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    runs.append("".join(current))
+    return runs
+
+
+def extract_required_literal(pattern: str) -> str:
+    """
+    Извлекает самую длинную подстроку, без которой шаблон
+    не может совпасть. Поддерживает подмножество синтаксиса,
+    используемое в LINKS (\\b, .*, экранированные буквы).
+    :param pattern: Исходная строка регулярного выражения
+    :return: Литерал в нижнем регистре или пустая строка
+    """
+    if any(ch in _UNSUPPORTED_CHARS for ch in pattern):
+        return ""
+    return max(_split_literal_runs(pattern), key=len).lower()
+
+
+def compile_pattern(pattern: str) -> LinkPattern:
+    return LinkPattern(regex=re.compile(pattern, re.IGNORECASE),
+                       literal=extract_required_literal(pattern))
+
+
+def _is_section(value, require_regex: bool = True) -> bool:
+    if not isinstance(value, dict) or "url" not in value:
+        return False
+    return "regex" in value or not require_regex
+
+
+def _has_subsections(value) -> bool:
+    return isinstance(value, dict) and "subsections" in value
+
+
+def flatten_links(data: Dict,
+                  require_regex: bool = True) -> List[Tuple[str, Dict]]:
+    """
+    Разворачивает дерево LINKS в плоский список (название, раздел)
+    в том же порядке, в котором его обходил рекурсивный поиск.
+    :param require_regex: Если True, попадают только разделы,
+    у которых есть и url, и regex; иначе все разделы со ссылкой.
+    """
+    sections: List[Tuple[str, Dict]] = []
+    for key, value in data.items():
+        if _is_section(value, require_regex):
+            sections.append((key, value))
+        elif _has_subsections(value):
+            sections.extend(flatten_links(value["subsections"],
+                                          require_regex))
+    return sections
+
+
+class LinkIndex:
+    """
+    Индекс ссылок, построенный один раз из структуры LINKS.
+    Шаблоны скомпилированы заранее, а обязательные литералы
+    позволяют отбросить большинство сообщений без запуска regex.
+    """
+
+    def __init__(self, entries: List[LinkEntry]):
+        self.entries: Tuple[LinkEntry, ...] = tuple(entries)
+        self._prefilter = self._build_prefilter(self.entries)
+
+    @staticmethod
+    def _build_prefilter(entries) -> Optional[Pattern]:
+        """
+        Собирает все обязательные литералы в одно регулярное выражение.
+        Если хотя бы у одного шаблона литерала нет, префильтр отключается.
+        """
+        literals = set()
+        for entry in entries:
+            for pattern in entry.patterns:
+                if not pattern.literal:
+                    return None
+                literals.add(pattern.literal)
+        if not literals:
+            return None
+        # Длинные литералы первыми, чтобы альтернация не обрезала их
+        ordered = sorted(literals, key=len, reverse=True)
+        return re.compile("|".join(re.escape(lit) for lit in ordered))
+
+    @classmethod
+    def from_links(cls, links: Dict,
+                   require_regex: bool = True) -> "LinkIndex":
+        entries = []
+        for name, section in flatten_links(links, require_regex):
+            raw_patterns = tuple(section.get("regex", []))
+            entries.append(LinkEntry(
+                name=name,
+                url=section["url"],
+                raw_patterns=raw_patterns,
+                patterns=tuple(compile_pattern(p) for p in raw_patterns)
+            ))
+        logger.debug(f"Построен индекс ссылок: {len(entries)} записей")
+        return cls(entries)
+
+    def search(self, keyword: str,
+               limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        Ищет разделы, совпадающие с ключевым словом.
+        :param keyword: Ключевое слово в нижнем регистре
+        :param limit: Максимальное число результатов
+        (поиск прекращается, как только оно набрано)
+        :return: Список кортежей (название, ссылка)
+        """
+        results: List[Tuple[str, str]] = []
+        if self._prefilter and not self._prefilter.search(keyword):
+            return results
+        for entry in self.entries:
+            if entry.matches(keyword):
+                logger.debug(f"Найдено совпадение: {entry.name} -> "
+                             f"{entry.url}")
+                results.append((entry.name, entry.url))
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
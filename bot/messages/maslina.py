@@ -1,37 +1,36 @@
 import logging
-from pathlib import Path
-from aiogram.types import Message, FSInputFile
+from aiogram.types import Message
 
+from bot.messages.parsed import ParsedMessage
+from bot.utils.media_registry import media_registry
 
-def contains_maslina(text: str) -> bool:
+# Картинка, которая отправляется в ответ
+IMAGE_NAME = "maslina.jpeg"
+
+
+def contains_maslina(lower_text: str) -> bool:
     """
     Проверяет, содержит ли текст слова "маслина"
-    или "маслину" (без учета регистра).
+    или "маслину". Текст должен быть уже в нижнем регистре.
     """
-    lower_text = text.lower()
     return "маслина" in lower_text or "маслину" in lower_text
 
 
-async def handle_maslina(message: Message, maslina_enable) -> bool:
+def is_maslina(parsed: ParsedMessage) -> bool:
+    return contains_maslina(parsed.lower)
+
+
+async def send_maslina(message: Message, parsed: ParsedMessage) -> bool:
     """
-    Если сообщение содержит слова "маслина" или "маслину",
-    отправляет картинку в виде реплая на это сообщение.
+    Отправляет картинку в виде реплая на сообщение
+    со словами "маслина" или "маслину".
     Возвращает True, если картинка была отправлена, иначе False.
     """
-    if not maslina_enable:
-        return False
-
-    if not message.text:
+    # Отправляем картинку реплаем на сообщение, содержащее ключевое слово.
+    # Картинка загружается один раз, дальше отправляется по file_id.
+    sent = await media_registry.send(
+        IMAGE_NAME, lambda photo: message.reply_photo(photo=photo))
+    if sent is None:
+        logging.error(f"Картинка не найдена: {IMAGE_NAME}")
         return False
-    if contains_maslina(message.text):
-        # Определяем путь к картинке.
-        base_dir = Path(__file__).resolve().parent.parent
-        image_path = base_dir / "utils" / "img" / "maslina.jpeg"
-        if not image_path.exists():
-            logging.error(f"Картинка не найдена по пути: {image_path}")
-            return False
-        photo = FSInputFile(str(image_path))
-        # Отправляем картинку реплаем на сообщение, содержащее ключевое слово.
-        await message.reply_photo(photo=photo)
-        return True
-    return False
+    return True
@@ -1,19 +1,32 @@
 import re
 import logging
+from dataclasses import dataclass, field
+from typing import List, Tuple
 from bot.config.links import LINKS
+from bot.config.flags import SEMANTIC_MATCH_ENABLE
+from bot.config.settings import (
+    SEARCH_KNOWLEDGE_MAX_WORDS,
+    SEARCH_KNOWLEDGE_CONFIDENT_SCORE,
+    SEMANTIC_MODEL_NAME,
+    SEMANTIC_THRESHOLD,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_WAIT_MS,
+    EMBEDDING_QUEUE_SIZE
+)
+from bot.messages.link_index import LinkIndex
+from bot.messages.semantic_match import SemanticLinkMatcher
 
-from typing import List, Tuple
 
 def should_skip(keyword: str) -> bool:
     """
     Определяет, нужно ли пропустить выдачу ссылок для статусных или негативных вопросов.
+    Ожидает текст, уже приведённый к нижнему регистру.
     """
-    lower = keyword.lower()
     # Статусные вопросы о работоспособности или жизненном цикле
-    if "не работает" in lower or "умер" in lower or "мерт" in lower or "жива" in lower:
+    if "не работает" in keyword or "умер" in keyword or "мерт" in keyword or "жива" in keyword:
         return True
     # Вопросы о работоспособности без слова 'как'
-    if re.search(r"\bработает\b", lower) and "как" not in lower:
+    if re.search(r"\bработает\b", keyword) and "как" not in keyword:
         return True
     return False
 
@@ -21,93 +34,85 @@ def should_skip(keyword: str) -> bool:
 logging.basicConfig(level=logging.DEBUG)
 
 
-def find_links_by_keyword(keyword):
-    """
-    Функция для поиска ссылок по ключевому слову в структуре LINKS.
-    :param keyword: Ключевое слово для поиска
-    :return: Список кортежей (название, ссылка), соответствующих ключевому слову
-    """
-    keyword = keyword.strip().lower()
-    # Пропускаем прямые статусные вопросы
-    if should_skip(keyword):
-        logging.debug(f"Пропускаем запрос на статус: {keyword}")
-        return []
-    logging.debug(f"Поиск по ключевому слову: {keyword}")
-    raw_results: List[Tuple[str, str]] = []
+# Индекс строится один раз при загрузке модуля (на старте бота)
+LINK_INDEX = LinkIndex.from_links(LINKS)
 
-    # Запускаем рекурсивный поиск
-    _recursive_search(LINKS, keyword, raw_results)
+# Семантический матчер учитывает и разделы без regex
+SEMANTIC_MATCHER = SemanticLinkMatcher(
+    LinkIndex.from_links(LINKS, require_regex=False).entries,
+    model_name=SEMANTIC_MODEL_NAME,
+    threshold=SEMANTIC_THRESHOLD,
+    batch_size=EMBEDDING_BATCH_SIZE,
+    max_wait_ms=EMBEDDING_MAX_WAIT_MS,
+    max_queue_size=EMBEDDING_QUEUE_SIZE
+)
 
-    return raw_results[:3]
+# Сколько ссылок максимум отдаём в ответ
+MAX_RESULTS = 3
 
 
-def _recursive_search(data, keyword, results, parent_name=""):
-    """
-    Рекурсивный поиск по структуре LINKS.
-    :param data: Текущая структура данных
-    :param keyword: Ключевое слово для поиска
-    :param results: Список результатов
-    :param parent_name: Имя родительского раздела
+async def find_links(keyword: str) -> list:
     """
-    for key, value in data.items():
-        if _is_section(value):
-            _process_section(key, value, keyword, results)
-        elif _has_subsections(value):
-            section_name = _build_section_name(parent_name, key)
-            _recursive_search(value["subsections"],
-                              keyword,
-                              results,
-                              section_name)
-
-
-def _is_section(value):
+    Ищет ссылки по регулярным выражениям и, если включён
+    семантический режим, дополняет результат ссылками,
+    близкими по смыслу (с косинусным сходством выше порога).
+    Совпадения по regex всегда идут первыми.
+    :param keyword: Текст сообщения в нижнем регистре без пробелов
+    по краям (ParsedMessage.lower), повторно не нормализуется
+    :return: Список кортежей (название, ссылка)
     """
-    Проверяет, является ли элемент разделом с URL и регулярными выражениями.
-    :param value: Проверяемое значение
-    :return: True, если это раздел; иначе False
-    """
-    return isinstance(value, dict) and "url" in value and "regex" in value
-
-
-def _has_subsections(value):
-    """
-    Проверяет, есть ли у элемента вложенные подразделы.
-    :param value: Проверяемое значение
-    :return: True, если есть вложенные подразделы; иначе False
-    """
-    return isinstance(value, dict) and "subsections" in value
+    if should_skip(keyword):
+        logging.debug(f"Пропускаем запрос на статус: {keyword}")
+        return []
 
+    results = LINK_INDEX.search(keyword, limit=MAX_RESULTS)
+    if not SEMANTIC_MATCH_ENABLE or len(results) >= MAX_RESULTS:
+        return results
 
-def _process_section(key, value, keyword, results):
-    """
-    Обрабатывает текущий раздел и
-    проверяет совпадение с регулярными выражениями.
-    :param key: Название раздела
-    :param value: Данные раздела
-    :param keyword: Ключевое слово для поиска
-    :param results: Список результатов
-    """
-    if is_match(keyword, value.get("regex", [])):
-        logging.debug(f"Найдено совпадение: {key} -> {value['url']}")
-        results.append((key, value["url"]))
+    seen_urls = {url for _, url in results}
+    for name, url in await SEMANTIC_MATCHER.search(keyword, MAX_RESULTS):
+        if url not in seen_urls:
+            seen_urls.add(url)
+            results.append((name, url))
+    return results[:MAX_RESULTS]
 
 
-def _build_section_name(parent_name, key):
+@dataclass
+class KnowledgeMatch:
     """
-    Строит имя текущего раздела с учётом родительского имени.
-    :param parent_name: Имя родительского раздела
-    :param key: Текущий ключ
-    :return: Полное имя раздела
+    Разделы LINKS, подходящие к вопросу /search.
+    :param links: Уверенные совпадения — ими можно ответить сразу
+    :param related: Возможные совпадения — подсказка для модели
     """
-    return parent_name + f" > {key}" if parent_name else key
+    links: List[Tuple[str, str]] = field(default_factory=list)
+    related: List[Tuple[str, str]] = field(default_factory=list)
 
 
-def is_match(keyword, regex_list):
+async def find_knowledge(query: str, vector=None) -> KnowledgeMatch:
     """
-    Проверяет, соответствует ли ключевое слово
-    хотя бы одному из регулярных выражений.
-    :param keyword: Ключевое слово
-    :param regex_list: Список регулярных выражений
-    :return: True, если есть совпадение; иначе False
+    Ищет ответ на вопрос /search в базе ссылок. Совпадение по regex
+    в коротком вопросе и смысловое совпадение с высоким сходством
+    считаются уверенными, остальные — только связанными.
+    :param query: Текст вопроса
+    :param vector: Эмбеддинг вопроса, если он уже посчитан
+    :return: Найденные разделы
     """
-    return any(re.search(regex, keyword, re.IGNORECASE) for regex in regex_list)
+    keyword = query.strip().lower()
+    if should_skip(keyword):
+        return KnowledgeMatch()
+    found = LINK_INDEX.search(keyword, limit=MAX_RESULTS)
+    if found and len(keyword.split()) <= SEARCH_KNOWLEDGE_MAX_WORDS:
+        return KnowledgeMatch(links=found)
+    if not SEMANTIC_MATCH_ENABLE:
+        return KnowledgeMatch(related=found)
+
+    scored = await SEMANTIC_MATCHER.search_scored(keyword, MAX_RESULTS,
+                                                  vector)
+    confident = [(name, url) for name, url, score in scored
+                 if score >= SEARCH_KNOWLEDGE_CONFIDENT_SCORE]
+    if confident and not found:
+        return KnowledgeMatch(links=confident)
+    seen_urls = {url for _, url in found}
+    related = found + [(name, url) for name, url, _ in scored
+                       if url not in seen_urls]
+    return KnowledgeMatch(related=related[:MAX_RESULTS])
@@ -1,18 +1,33 @@
-import asyncio
 import logging
-from datetime import datetime, timedelta
 import random
+from typing import Optional
 
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 
-from bot.messages.message_parse import find_links_by_keyword
-from bot.messages.who_request import handle_who_request
-from bot.messages.bot_tag import handle_bot_tag
+from bot.messages.message_parse import find_links
+from bot.messages.parsed import (
+    ParsedMessage,
+    ParsedMessageMiddleware,
+    parse_message
+)
+from bot.messages.triggers import Trigger, TriggerPipeline
+from bot.utils.outbound import FUN
+from bot.messages.who_request import is_who_request, send_who_request
+from bot.messages.bot_tag import is_bot_tag, send_bot_tag
 from bot.utils.participants import update_participant
-from bot.messages.maslina import handle_maslina   # импортируем новый модуль
+from bot.utils.ttl_cache import TTLCache
+from bot.utils.reactions import reaction_store
+from bot.utils.edit_coalescer import EditCoalescer
+from bot.messages.maslina import is_maslina, send_maslina
 from bot.config.tokens import BOT_USERNAME
+from bot.config.settings import (
+    TRIGGER_MAX_CONCURRENCY,
+    RECENT_LINKS_MAX_PER_CHAT,
+    RECENT_LINKS_MAX_SIZE,
+    REACTION_EDIT_WINDOW
+)
 from bot.config.flags import (
     KEYWORD_RESPONSES_ENABLE,
     TIMEOUT_RESPONSES_ENABLE,
@@ -24,14 +39,20 @@ from bot.config.flags import (
 # Настройка времени таймаута (в минутах)
 TIMEOUT_MINUTES: int = 30
 
-# Хранилище для предотвращения повторных ответов (по чатам)
-recent_links: dict = {}  # Формат: {chat_id: {"url": время последнего ответа}}
+# Вероятность ответа картинкой на фразы вида "а кто..."
+WHO_REQUEST_PROBABILITY: float = 0.3
 
-# Хранилище для подсчета лайков и дизлайков: {(chat_id, message_id): {"likes": int, "dislikes": int}}
-reaction_counts: dict = {}
+# Недавно отправленные ссылки, чтобы не повторять ответ (по чатам).
+# Записи живут TIMEOUT_MINUTES и удаляются при чтении или очисткой
+recent_links = TTLCache(ttl=TIMEOUT_MINUTES * 60,
+                        max_size=RECENT_LINKS_MAX_SIZE,
+                        max_per_group=RECENT_LINKS_MAX_PER_CHAT)
 
+# Правки клавиатуры лайков: не чаще одной за окно на сообщение
+reaction_edits = EditCoalescer(window=REACTION_EDIT_WINDOW)
 
-def should_process_text(text: str) -> bool:
+
+def should_process_text(parsed: ParsedMessage) -> bool:
     """
     Возвращает True, если текст сообщения должен быть обработан.
     Проверяются:
@@ -39,11 +60,12 @@ def should_process_text(text: str) -> bool:
       - Если сообщение начинается со слеша (команда)
       - Если функция парсинга сообщений отключена
     """
-    if should_ignore_bot_mention(text, BOT_USERNAME):
+    if parsed.is_bot_mention_only:
         logging.debug("Сообщение равно упоминанию бота, обработка прекращена.")
         return False
-    if text.startswith("/"):
-        logging.debug(f"Сообщение {text} игнорируется, так как это команда.")
+    if parsed.is_command:
+        logging.debug(f"Сообщение {parsed.text} игнорируется, "
+                      f"так как это команда.")
         return False
     if not KEYWORD_RESPONSES_ENABLE:
         logging.debug("Функция парсинга сообщений отключена")
@@ -51,64 +73,91 @@ def should_process_text(text: str) -> bool:
     return True
 
 
-def should_ignore_bot_mention(text: str, bot_username) -> bool:
+def should_answer_who_request(parsed: ParsedMessage) -> bool:
     """
-    Возвращает True, если текст сообщения ровно равен упоминанию бота.
+    На фразы вида "а кто..." бот отвечает не всегда,
+    а с вероятностью WHO_REQUEST_PROBABILITY.
     """
-    normalized_username = bot_username[0] \
-        if isinstance(bot_username, tuple) \
-        else bot_username
-    return text.lower() == f"@{normalized_username.lower()}"
+    if not (WHO_REQUEST_ENABLE and is_who_request(parsed)):
+        return False
+    if random.random() < WHO_REQUEST_PROBABILITY:
+        return True
+    logging.debug("Случайное условие не выполнено")
+    return False
+
+
+def should_send_links(parsed: ParsedMessage) -> bool:
+    return should_process_text(parsed) and bool(parsed.lower)
+
+
+async def send_links(message: Message, parsed: ParsedMessage) -> None:
+    """
+    Ищет ссылки по тексту сообщения и отправляет их ответом.
+    """
+    logging.debug(f"Извлечённое ключевое слово: {parsed.lower}")
+    results: list = await find_links(parsed.lower)
+    if results:
+        await process_results(message, results)
+    else:
+        logging.debug("Совпадений не найдено.")
 
 
-async def handle_message(message: Message, state: FSMContext) -> None:
+# Ответы на одно сообщение: медиа-реплаи идут одной группой,
+# чтобы их порядок в чате не менялся от сообщения к сообщению.
+# Развлекательные ответы уступают очередь ответам со ссылками
+TRIGGER_PIPELINE = TriggerPipeline([
+    Trigger("bot_tag",
+            lambda parsed: BOT_TAG_ENABLE and is_bot_tag(parsed),
+            send_bot_tag,
+            priority=FUN),
+    Trigger("who_request",
+            should_answer_who_request,
+            send_who_request,
+            group="fun_reply",
+            priority=FUN),
+    Trigger("maslina",
+            lambda parsed: MASLINA_ENABLE and is_maslina(parsed),
+            send_maslina,
+            group="fun_reply",
+            priority=FUN),
+    Trigger("links", should_send_links, send_links),
+], max_concurrency=TRIGGER_MAX_CONCURRENCY)
+
+
+async def handle_message(message: Message,
+                         state: FSMContext,
+                         parsed: Optional[ParsedMessage] = None) -> None:
     """
     Основная функция для обработки текстовых сообщений пользователя.
+    Текст разбирается один раз в ParsedMessageMiddleware, после чего
+    сработавшие триггеры отправляют ответы параллельно.
     """
     if not message.text:
         logging.debug("Сообщение не содержит текста, обработка пропущена.")
         return
-
-    text: str = message.text.strip()
+    if parsed is None:
+        parsed = parse_message(message, BOT_USERNAME)
 
     # Обновляем или добавляем участника в БД на основе сообщения
     update_participant(message)
 
-    # Обработка дополнительных фановых триггеров
-    await handle_bot_tag(message, BOT_USERNAME, BOT_TAG_ENABLE)
-
-    if random.random() < 0.3:
-        await handle_who_request(message, WHO_REQUEST_ENABLE)
-    else:
-        logging.debug("Случайное условие не выполнено")
-
-    await handle_maslina(message, MASLINA_ENABLE)
-
-    # Если текст не проходит фильтрацию, дальнейшая обработка не требуется
-    if not should_process_text(text):
-        return
-
-    keyword: str = extract_keyword(message)
-    if not keyword:
-        return
-
-    results: list = find_links_by_keyword(keyword)
-    if results:
-        await process_results(message, results)
-    else:
-        logging.debug("Совпадений не найдено.")
+    fired = await TRIGGER_PIPELINE.run(message, parsed)
+    logging.debug(f"Сработавшие триггеры: {fired}")
 
 
-def extract_keyword(message: Message) -> str:
+def reaction_keyboard(likes: int = 0,
+                      dislikes: int = 0) -> InlineKeyboardMarkup:
     """
-    Извлекает ключевое слово из сообщения.
+    Клавиатура лайков и дизлайков. Сообщение, к которому относится
+    голос, берётся из callback_query.message, поэтому клавиатуру
+    можно отправить вместе с ответом одним запросом.
     """
-    if not message.text:
-        logging.debug(f"Сообщение не содержит текста: {message}")
-        return ""
-    keyword: str = message.text.strip().lower()
-    logging.debug(f"Извлечённое ключевое слово: {keyword}")
-    return keyword
+    like_button = InlineKeyboardButton(text=f"👍 {likes}",
+                                       callback_data="like")
+    dislike_button = InlineKeyboardButton(text=f"👎 {dislikes}",
+                                          callback_data="dislike")
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[like_button, dislike_button]])
 
 
 async def process_results(message: Message, results: list) -> None:
@@ -124,26 +173,9 @@ async def process_results(message: Message, results: list) -> None:
     if filtered_results:
         response: str = format_response(filtered_results)
         logging.debug(f"Отправка ссылки: {response}")
-        # Кнопка лайк с начальным значением 0
-        like_button = InlineKeyboardButton(text="👍 0", callback_data="like_init")
-        # Кнопка дизлайк
-        dislike_button = InlineKeyboardButton(text="👎 0", callback_data="dislike_init")
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[[like_button, dislike_button]], row_width=2)
-        sent = await message.answer(response, reply_to_message_id=message.message_id, reply_markup=keyboard)
-        # Инициализируем счётчики для отправленного сообщения
-        reaction_counts[(sent.chat.id, sent.message_id)] = {"likes": 0, "dislikes": 0}
-        # Обновляем callback_data, чтобы содержали реальные chat_id и message_id
-        new_like_data = f"like:{sent.chat.id}:{sent.message_id}"
-        new_dislike_data = f"dislike:{sent.chat.id}:{sent.message_id}"
-        like_button = InlineKeyboardButton(text="👍 0", callback_data=new_like_data)
-        dislike_button = InlineKeyboardButton(text="👎 0", callback_data=new_dislike_data)
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[[like_button, dislike_button]], row_width=2)
-        await sent.edit_reply_markup(reply_markup=keyboard)
-
-        # Планируем удаление ссылок из recent_links через таймаут
-        if TIMEOUT_RESPONSES_ENABLE:
-            for _, url in filtered_results:
-                asyncio.create_task(remove_link_after_timeout(message.chat.id, url))
+        await message.answer(response,
+                             reply_to_message_id=message.message_id,
+                             reply_markup=reaction_keyboard())
     else:
         logging.debug("Все ссылки уже были отправлены недавно.")
 
@@ -153,16 +185,13 @@ def filter_recent_links(chat_id: int, results: list) -> list:
     Фильтрует ссылки, которые уже были отправлены недавно для конкретного чата.
     """
     filtered_results = []
-    chat_recent_links = recent_links.setdefault(chat_id, {})
     for name, url in results:
-        if (url in chat_recent_links
-                and datetime.now() - chat_recent_links[url]
-                < timedelta(minutes=TIMEOUT_MINUTES)):
+        if recent_links.contains(chat_id, url):
             logging.debug(f"Пропуск отправки ссылки '{url}' "
                           f"для чата {chat_id} (отправлялась недавно).")
         else:
             filtered_results.append((name, url))
-            chat_recent_links[url] = datetime.now()
+            recent_links.set(chat_id, url)
     return filtered_results
 
 
@@ -174,74 +203,64 @@ def format_response(results: list) -> str:
             + "\n".join([f"{name}: {url}" for name, url in results]))
 
 
-async def remove_link_after_timeout(chat_id: int, url: str) -> None:
+def message_urls(message: Message) -> list:
     """
-    Удаляет ссылку из recent_links для конкретного чата через заданный таймаут.
+    Ссылки, которые Telegram распознал в тексте сообщения.
     """
-    await asyncio.sleep(TIMEOUT_MINUTES * 60)
-    chat_recent_links = recent_links.get(chat_id, {})
-    if url in chat_recent_links:
-        del chat_recent_links[url]
-        logging.debug(f"Ссылка '{url}' удалена из кэша для чата {chat_id}.")
+    return [entity.extract_from(message.text)
+            for entity in message.entities or ()
+            if entity.type == "url"]
 
 
-async def handle_like_callback(callback_query: CallbackQuery) -> None:
+async def handle_reaction(callback_query: CallbackQuery,
+                          is_like: bool) -> None:
     """
-    Обработка нажатия на кнопку лайк.
+    Учитывает лайк или дизлайк под ответом со ссылками.
+    Каждый пользователь голосует за сообщение один раз.
+    Счётчики обновляются сразу, а клавиатура — не чаще раза
+    в REACTION_EDIT_WINDOW секунд, с последними значениями.
     """
-    data = callback_query.data  # формата "like:chat_id:message_id"
-    _, chat_id_str, message_id_str = data.split(":")
-    chat_id = int(chat_id_str)
-    message_id = int(message_id_str)
-    key = (chat_id, message_id)
-    if key not in reaction_counts:
+    msg = callback_query.message
+    if msg is None:
         await callback_query.answer()
         return
-    # Увеличиваем счётчик лайков
-    reaction_counts[key]["likes"] += 1
-    likes = reaction_counts[key]["likes"]
-    dislikes = reaction_counts[key]["dislikes"]
-    # Получаем текущий объект сообщения
-    msg = callback_query.message
-    # Обновляем клавиатуру с новым значением лайков и дизлайков
-    like_button = InlineKeyboardButton(text=f"👍 {likes}", callback_data=f"like:{chat_id}:{message_id}")
-    dislike_button = InlineKeyboardButton(text=f"👎 {dislikes}", callback_data=f"dislike:{chat_id}:{message_id}")
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[[like_button, dislike_button]], row_width=2)
-    await msg.edit_reply_markup(reply_markup=keyboard)
-    await callback_query.answer("👍")
+    chat_id = msg.chat.id
+    accepted, counts = await reaction_store.vote(
+        chat_id, msg.message_id, callback_query.from_user.id, is_like)
+    if not accepted:
+        await callback_query.answer("Ты уже голосовал за это сообщение")
+        return
+
+    # Если дизлайков стало больше, чем лайков — удаляем сообщение
+    if counts.dislikes > counts.likes:
+        reaction_edits.discard((chat_id, msg.message_id))
+        await msg.delete()
+        # Удаляем голоса и разрешаем снова отправлять эти ссылки
+        await reaction_store.forget(chat_id, msg.message_id)
+        for url in message_urls(msg):
+            recent_links.pop(chat_id, url)
+        await callback_query.answer("Сообщение удалено")
+        return
+
+    await callback_query.answer("👍" if is_like else "👎")
+    reaction_edits.request(
+        (chat_id, msg.message_id),
+        lambda: msg.edit_reply_markup(
+            reply_markup=reaction_keyboard(counts.likes, counts.dislikes)))
+
+
+async def handle_like_callback(callback_query: CallbackQuery) -> None:
+    """
+    Обработка нажатия на кнопку лайк.
+    """
+    await handle_reaction(callback_query, is_like=True)
 
 
 async def handle_dislike_callback(callback_query: CallbackQuery) -> None:
     """
     Обработка нажатия на кнопку дизлайк.
     """
-    data = callback_query.data  # формата "dislike:chat_id:message_id"
-    _, chat_id_str, message_id_str = data.split(":")
-    chat_id = int(chat_id_str)
-    message_id = int(message_id_str)
-    key = (chat_id, message_id)
-    if key not in reaction_counts:
-        await callback_query.answer()
-        return
-    # Увеличиваем счётчик дизлайков
-    reaction_counts[key]["dislikes"] += 1
-    dislikes = reaction_counts[key]["dislikes"]
-    likes = reaction_counts[key]["likes"]
-    msg = callback_query.message
-    # Если дизлайков стало больше, чем лайков — удаляем сообщение
-    if dislikes > likes:
-        await msg.delete()
-        # Удаляем записи из хранилищ
-        reaction_counts.pop(key, None)
-        recent_links.get(chat_id, {}).pop(msg.text, None)
-        await callback_query.answer("Сообщение удалено")
-    else:
-        # Обновляем клавиатуру с новыми значениями лайков и дизлайков
-        like_button = InlineKeyboardButton(text=f"👍 {likes}", callback_data=f"like:{chat_id}:{message_id}")
-        dislike_button = InlineKeyboardButton(text=f"👎 {dislikes}", callback_data=f"dislike:{chat_id}:{message_id}")
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[[like_button, dislike_button]], row_width=2)
-        await msg.edit_reply_markup(reply_markup=keyboard)
-        await callback_query.answer("👎")
+    await handle_reaction(callback_query, is_like=False)
 
 
 async def no_fsm_filter(message: Message, state: FSMContext) -> bool:
@@ -259,6 +278,12 @@ def register_message_handlers(dp) -> None:
     """
     Регистрирует глобальный обработчик сообщений.
     """
+    dp.message.middleware(ParsedMessageMiddleware(BOT_USERNAME))
     dp.message.register(handle_message, no_fsm_filter)
-    dp.callback_query.register(handle_like_callback, lambda c: c.data and c.data.startswith("like:"))
-    dp.callback_query.register(handle_dislike_callback, lambda c: c.data and c.data.startswith("dislike:"))
+    # "like:<chat_id>:<message_id>" — кнопки под старыми ответами
+    dp.callback_query.register(
+        handle_like_callback,
+        lambda c: c.data and c.data.split(":")[0] == "like")
+    dp.callback_query.register(
+        handle_dislike_callback,
+        lambda c: c.data and c.data.split(":")[0] == "dislike")
@@ -0,0 +1,95 @@
+import logging
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_bot_username(bot_username) -> str:
+    """
+    Если bot_username передан как кортеж, возвращает первый элемент.
+    Иначе возвращает строку.
+    """
+    if isinstance(bot_username, tuple):
+        return bot_username[0]
+    return bot_username or ""
+
+
+@dataclass
+class ParsedMessage:
+    """
+    Результат однократного разбора текста сообщения.
+    Общий для всех триггеров, чтобы каждый из них не приводил
+    текст к нижнему регистру и не обходил entities заново.
+    :param text: Текст без пробелов по краям
+    :param lower: Тот же текст в нижнем регистре
+    :param is_command: Сообщение начинается со слеша
+    :param bot_mentioned: В сообщении есть упоминание бота
+    :param is_bot_mention_only: Сообщение состоит только из упоминания бота
+    """
+    text: str
+    lower: str
+    is_command: bool
+    bot_mentioned: bool
+    is_bot_mention_only: bool
+
+    @cached_property
+    def tokens(self) -> Tuple[str, ...]:
+        """Слова сообщения в нижнем регистре (считаются по требованию)."""
+        return tuple(self.lower.split())
+
+
+def _has_bot_mention(message: Message, mention: str) -> bool:
+    """
+    Проверяет entities сообщения на упоминание бота.
+    :param mention: Упоминание в нижнем регистре, вместе с '@'
+    """
+    for entity in message.entities or ():
+        if (entity.type == "mention"
+                and entity.extract_from(message.text).lower() == mention):
+            return True
+    return False
+
+
+def parse_message(message: Message, bot_username) -> ParsedMessage:
+    """
+    Разбирает текст сообщения один раз.
+    :param message: Объект сообщения с непустым текстом
+    :param bot_username: Имя бота без '@' (строка или кортеж)
+    """
+    text = message.text.strip()
+    lower = text.lower()
+    mention = f"@{normalize_bot_username(bot_username).lower()}"
+    return ParsedMessage(
+        text=text,
+        lower=lower,
+        is_command=text.startswith("/"),
+        bot_mentioned=_has_bot_mention(message, mention),
+        is_bot_mention_only=lower == mention
+    )
+
+
+class ParsedMessageMiddleware(BaseMiddleware):
+    """
+    Разбирает текст входящего сообщения и передаёт результат
+    обработчикам в параметре parsed.
+    """
+
+    def __init__(self, bot_username):
+        self.bot_username = bot_username
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]],
+                              Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]) -> Any:
+        parsed: Optional[ParsedMessage] = None
+        if isinstance(event, Message) and event.text:
+            parsed = parse_message(event, self.bot_username)
+        data["parsed"] = parsed
+        return await handler(event, data)
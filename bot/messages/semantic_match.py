@@ -0,0 +1,170 @@
+import re
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bot.messages.link_index import LinkEntry
+from bot.utils.embedding_batcher import EmbeddingBatcher
+
+logger = logging.getLogger(__name__)
+
+# Служебные конструкции regex, которые не несут смысла для модели
+_REGEX_NOISE = re.compile(r"\\b|[.*+?^$\\]")
+
+
+def regex_to_hint(pattern: str) -> str:
+    """
+    Превращает регулярное выражение из LINKS в текстовую подсказку.
+    Например, r"\\bдоступ на ПП\\b" -> "доступ на ПП".
+    """
+    return _REGEX_NOISE.sub("", pattern).strip()
+
+
+def entry_text(entry: LinkEntry) -> str:
+    """
+    Формирует текст записи для эмбеддинга: название и подсказки из regex.
+    """
+    hints = []
+    for pattern in entry.raw_patterns:
+        hint = regex_to_hint(pattern)
+        if hint and hint not in hints:
+            hints.append(hint)
+    if not hints:
+        return entry.name
+    return f"{entry.name}: {', '.join(hints)}"
+
+
+class SemanticLinkMatcher:
+    """
+    Семантический поиск ссылок по эмбеддингам sentence_transformers.
+    Записи LINKS кодируются один раз в нормализованную матрицу,
+    а сходство с сообщением считается одним матричным умножением.
+    Модель загружается лениво и работает в отдельном потоке,
+    чтобы не блокировать цикл событий. Сообщения из всех чатов
+    кодируются пачками через EmbeddingBatcher.
+    """
+
+    def __init__(self,
+                 entries: Sequence[LinkEntry],
+                 model_name: str,
+                 threshold: float,
+                 batch_size: int = 32,
+                 max_wait_ms: float = 5.0,
+                 max_queue_size: int = 1000):
+        self.entries = tuple(entries)
+        self.model_name = model_name
+        self.threshold = threshold
+        self._model = None
+        self._matrix: Optional[np.ndarray] = None
+        self._failed = False
+        self._lock = threading.Lock()
+        self._batcher = EmbeddingBatcher(self.encode,
+                                         max_batch_size=batch_size,
+                                         max_wait_ms=max_wait_ms,
+                                         max_queue_size=max_queue_size)
+
+    def _ensure_loaded(self) -> bool:
+        """
+        Загружает модель и строит матрицу эмбеддингов записей.
+        Вызывается из рабочего потока.
+        :return: True, если матчер готов к работе
+        """
+        with self._lock:
+            if self._matrix is not None:
+                return True
+            if self._failed:
+                return False
+            try:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(self.model_name)
+                texts = [entry_text(entry) for entry in self.entries]
+                self._matrix = model.encode(
+                    texts,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True
+                ).astype(np.float32)
+                self._model = model
+                logger.info(f"Семантический индекс построен: "
+                            f"{len(texts)} записей, модель "
+                            f"{self.model_name}")
+                return True
+            except Exception as e:
+                self._failed = True
+                logger.error(f"Не удалось загрузить модель "
+                             f"{self.model_name}: {e}")
+                return False
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Синхронно кодирует тексты в нормализованные векторы.
+        """
+        if not self._ensure_loaded():
+            raise RuntimeError("Семантическая модель недоступна")
+        return self._model.encode(
+            texts,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        ).astype(np.float32)
+
+    async def warm_up(self) -> bool:
+        """
+        Загружает модель заранее (на старте бота), не блокируя цикл событий.
+        """
+        return await asyncio.to_thread(self._ensure_loaded)
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Возвращает эмбеддинг одного сообщения. Текст попадает в общую
+        очередь и кодируется вместе с сообщениями из других чатов.
+        """
+        return await self._batcher.embed(text)
+
+    async def close(self) -> None:
+        await self._batcher.stop()
+
+    def rank(self, vector: np.ndarray,
+             limit: int) -> List[Tuple[str, str, float]]:
+        """
+        Считает косинусное сходство вектора со всеми записями
+        и возвращает лучшие совпадения выше порога.
+        :return: Список кортежей (название, ссылка, сходство)
+        """
+        scores = self._matrix @ vector
+        best = np.argsort(-scores)[:limit]
+        return [(self.entries[i].name, self.entries[i].url, float(scores[i]))
+                for i in best if scores[i] >= self.threshold]
+
+    async def search_scored(self, text: str, limit: int,
+                            vector: Optional[np.ndarray] = None
+                            ) -> List[Tuple[str, str, float]]:
+        """
+        Ищет ссылки, близкие по смыслу к тексту сообщения.
+        При недоступной модели возвращает пустой список.
+        :param vector: Готовый эмбеддинг текста, если он уже посчитан
+        :return: Список кортежей (название, ссылка, сходство)
+        """
+        if self._failed or not self.entries:
+            return []
+        try:
+            if vector is None:
+                vector = await self.embed(text)
+        except Exception as e:
+            logger.error(f"Ошибка семантического поиска: {e}")
+            return []
+        matches = self.rank(vector, limit)
+        for name, url, score in matches:
+            logger.debug(f"Семантическое совпадение {score:.2f}: "
+                         f"{name} -> {url}")
+        return matches
+
+    async def search(self, text: str,
+                     limit: int) -> List[Tuple[str, str]]:
+        """
+        Ищет ссылки, близкие по смыслу к тексту сообщения.
+        :return: Список кортежей (название, ссылка)
+        """
+        return [(name, url) for name, url, _
+                in await self.search_scored(text, limit)]
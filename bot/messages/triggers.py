@@ -0,0 +1,168 @@
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence
+)
+
+from aiogram.types import Message
+
+from bot.messages.parsed import ParsedMessage
+from bot.utils.outbound import INTERACTIVE, send_priority
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних замеров триггера хранится для p50/p95
+LATENCY_SAMPLES = 1000
+
+
+@dataclass(frozen=True)
+class Trigger:
+    """
+    Реакция бота на текстовое сообщение.
+    :param name: Имя триггера (для логов и статистики)
+    :param fires: Синхронная и дешёвая проверка, срабатывает ли триггер
+    :param send: Корутина, отправляющая ответ
+    :param group: Триггеры одной группы отправляются последовательно
+    в порядке объявления; разные группы — параллельно
+    :param priority: Класс приоритета ответа в очереди исходящих сообщений
+    """
+    name: str
+    fires: Callable[[ParsedMessage], bool]
+    send: Callable[[Message, ParsedMessage], Awaitable[Any]]
+    group: Optional[str] = None
+    priority: int = INTERACTIVE
+
+
+@dataclass
+class TriggerLatency:
+    """
+    Задержки триггера с последнего отчёта (в секундах).
+    """
+    count: int = 0
+    errors: int = 0
+    samples: Deque[float] = field(
+        default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+    def add(self, elapsed: float, failed: bool) -> None:
+        self.count += 1
+        self.errors += int(failed)
+        self.samples.append(elapsed)
+
+    def percentile(self, share: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+class TriggerPipeline:
+    """
+    Сначала синхронно определяет, какие триггеры срабатывают,
+    затем отправляет ответы параллельно. Общее число одновременных
+    отправок по всем сообщениям ограничено max_concurrency.
+    Задержки триггеров раз в интервал отчёта пишутся в лог (p50/p95).
+    """
+
+    def __init__(self, triggers: Sequence[Trigger], max_concurrency: int):
+        self.triggers = tuple(triggers)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.latency: Dict[str, TriggerLatency] = {
+            trigger.name: TriggerLatency() for trigger in self.triggers
+        }
+        self._reporter: Optional[asyncio.Task] = None
+
+    def classify(self, parsed: ParsedMessage) -> List[Trigger]:
+        return [trigger for trigger in self.triggers if trigger.fires(parsed)]
+
+    async def run(self, message: Message, parsed: ParsedMessage) -> List[str]:
+        """
+        Запускает сработавшие триггеры.
+        :return: Имена сработавших триггеров
+        """
+        fired = self.classify(parsed)
+        if not fired:
+            return []
+
+        groups: Dict[Any, List[Trigger]] = {}
+        for trigger in fired:
+            # Триггер без группы образует собственную группу
+            key = trigger.group or trigger.name
+            groups.setdefault(key, []).append(trigger)
+
+        await asyncio.gather(*(self._run_group(group, message, parsed)
+                               for group in groups.values()))
+        return [trigger.name for trigger in fired]
+
+    async def _run_group(self, group: List[Trigger],
+                         message: Message,
+                         parsed: ParsedMessage) -> None:
+        async with self._semaphore:
+            for trigger in group:
+                await self._run_one(trigger, message, parsed)
+
+    async def _run_one(self, trigger: Trigger,
+                       message: Message,
+                       parsed: ParsedMessage) -> None:
+        started = time.perf_counter()
+        failed = False
+        try:
+            with send_priority(trigger.priority):
+                await trigger.send(message, parsed)
+        except Exception as e:
+            failed = True
+            logger.error(f"Ошибка триггера {trigger.name}: {e}")
+        elapsed = time.perf_counter() - started
+        self.latency[trigger.name].add(elapsed, failed)
+        logger.debug(f"Триггер {trigger.name} выполнен "
+                     f"за {elapsed * 1000:.1f} мс")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Сводка задержек по триггерам (в миллисекундах).
+        """
+        return {
+            name: {"count": item.count,
+                   "errors": item.errors,
+                   "p50_ms": item.percentile(0.5) * 1000,
+                   "p95_ms": item.percentile(0.95) * 1000}
+            for name, item in self.latency.items()
+        }
+
+    def report(self) -> None:
+        """
+        Пишет в лог задержки сработавших с прошлого отчёта триггеров
+        и начинает новый интервал.
+        """
+        for name, item in self.stats().items():
+            if item["count"]:
+                logger.info(f"Триггер {name}: вызовов {item['count']}, "
+                            f"ошибок {item['errors']}, "
+                            f"p50 {item['p50_ms']:.1f} мс, "
+                            f"p95 {item['p95_ms']:.1f} мс")
+        self.latency = {name: TriggerLatency() for name in self.latency}
+
+    async def _run_reporter(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.report()
+
+    def start(self, report_interval: float) -> None:
+        """
+        Запускает периодический отчёт о задержках.
+        """
+        if self._reporter is None or self._reporter.done():
+            self._reporter = asyncio.create_task(
+                self._run_reporter(report_interval))
+
+    async def stop(self) -> None:
+        if self._reporter is not None:
+            self._reporter.cancel()
+            try:
+                await self._reporter
+            except asyncio.CancelledError:
+                pass
+            self._reporter = None
@@ -1,54 +1,41 @@
 import logging
-from aiogram.types import Message, FSInputFile
-from pathlib import Path
+from aiogram.types import Message
 
-# Путь к папке с изображениями
-BASE_DIR = Path(__file__).resolve().parent.parent
-IMG_DIR = BASE_DIR / "utils" / "img"
+from bot.messages.parsed import ParsedMessage
+from bot.utils.media_registry import media_registry
+
+# Изображение, которое отправляется в ответ
+IMAGE_NAME = "a_kto_cenz.png"
 
 # Триггерные фразы
-TRIGGERS = ["а кто",
+TRIGGERS = ("а кто",
             "а почему",
             "а когда",
             "а где",
-            "а как"]
+            "а как")
 
 
-async def handle_who_request(message: Message,
-                             who_request_enable: bool):
+def is_who_request(parsed: ParsedMessage) -> bool:
     """
-    Обрабатывает сообщения, начинающиеся с заданных фраз.
-    Если сообщение соответствует, отправляет фиксированное изображение в ответ.
-    :param message: Сообщение от пользователя
-    :param who_request_enable: Флаг, разрешающий выполнение функции.
+    Проверяет, начинается ли сообщение с одной из триггерных фраз.
     """
-    if not who_request_enable:
-        return
-
-    # Проверяем, есть ли текст в сообщении
-    if not message.text:
-        logging.debug("Сообщение не содержит текста. Пропускаем обработку.")
-        return
+    return parsed.lower.startswith(TRIGGERS)
 
-    # Проверяем, начинается ли сообщение с одной из триггерных фраз
-    message_text = message.text.lower()
-    if not any(message_text.startswith(trigger) for trigger in TRIGGERS):
-        return
 
-    logging.debug(f"Обнаружен запрос '{message_text}' "
+async def send_who_request(message: Message, parsed: ParsedMessage):
+    """
+    Отправляет фиксированное изображение в ответ на сообщение,
+    начинающееся с триггерной фразы.
+    :param message: Сообщение от пользователя
+    :param parsed: Разобранный текст сообщения
+    """
+    logging.debug(f"Обнаружен запрос '{parsed.lower}' "
                   f"с одним из триггеров: {TRIGGERS}")
 
-    # Путь к конкретному изображению
-    image_path = IMG_DIR / "a_kto_cenz.png"
-    if not image_path.exists():
-        logging.warning(f"Изображение '{image_path}' не найдено.")
-        return
-
-    logging.debug(f"Отправка изображения: {image_path}")
-
-    # Создаем объект FSInputFile с указанием пути к файлу
-    photo = FSInputFile(image_path)
-
-    # Отправляем изображение
-    await message.answer_photo(photo=photo,
-                               reply_to_message_id=message.message_id)
+    # Изображение загружается один раз, дальше отправляется по file_id
+    sent = await media_registry.send(
+        IMAGE_NAME,
+        lambda photo: message.answer_photo(
+            photo=photo, reply_to_message_id=message.message_id))
+    if sent is None:
+        logging.warning(f"Изображение '{IMAGE_NAME}' не найдено.")
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, func
+from sqlalchemy import (
+    Column, Integer, String, DateTime, Boolean, Index, UniqueConstraint,
+    ForeignKey, func
+)
 from bot.database import Base
 
 
@@ -35,6 +38,13 @@ class Participant(Base):
     full_name = Column(String, nullable=False)
     username = Column(String, nullable=True)
     chat_title = Column(String, nullable=True)
+    last_active = Column(DateTime, nullable=True, index=True)
+
+    # Одна запись на участника чата (по ней работает upsert при сбросе)
+    __table_args__ = (
+        UniqueConstraint("chat_id", "user_id",
+                         name="uq_participants_chat_user"),
+    )
 
 
 class Chat(Base):
@@ -50,15 +60,86 @@ class Chat(Base):
     deleted_at = Column(DateTime, nullable=True)
 
 
+class AnnounceJob(Base):
+    __tablename__ = "announce_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # pending, running, done
+    status = Column(String, default="pending", nullable=False, index=True)
+    created_by = Column(String, nullable=False)
+    text = Column(String, nullable=True)
+    # Сообщение, которое копируется в чаты
+    source_chat_id = Column(String, nullable=True)
+    source_message_id = Column(Integer, nullable=True)
+    # Медиа рассылки в JSON: [{"type", "file_id", "caption"}, ...]
+    media = Column(String, nullable=True)
+    # Сообщение администратору о ходе рассылки
+    status_chat_id = Column(String, nullable=True)
+    status_message_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class AnnounceDelivery(Base):
+    __tablename__ = "announce_deliveries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("announce_jobs.id"), nullable=False)
+    chat_id = Column(String, nullable=False)
+    chat_title = Column(String, nullable=True)
+    # pending, sent, failed
+    status = Column(String, default="pending", nullable=False)
+    error = Column(String, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("job_id", "chat_id",
+                         name="uq_announce_deliveries_chat"),
+        Index("ix_announce_deliveries_job_status", "job_id", "status"),
+    )
+
+
 class SearchLog(Base):
     __tablename__ = "search_logs"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=False, index=True)
     username = Column(String, nullable=True)
     full_name = Column(String, nullable=False)
     query = Column(String, nullable=False)
-    timestamp = Column(DateTime, default=func.now(), nullable=False)
+    timestamp = Column(DateTime, default=func.now(), nullable=False,
+                       index=True)
+    # Откуда взят ответ без OpenAI (exact, semantic, links, shared)
+    # или NULL
+    cache_hit = Column(String, nullable=True)
+    # Время от запроса до ответа в миллисекундах
+    latency_ms = Column(Integer, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    error = Column(String, nullable=True)
+
+
+class SearchRollup(Base):
+    """
+    Почасовая сводка запросов /search по нормализованному тексту.
+    """
+    __tablename__ = "search_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Начало часа (UTC)
+    hour = Column(DateTime, nullable=False, index=True)
+    query = Column(String, nullable=False)
+    requests = Column(Integer, default=0, nullable=False)
+    cache_hits = Column(Integer, default=0, nullable=False)
+    errors = Column(Integer, default=0, nullable=False)
+    tokens = Column(Integer, default=0, nullable=False)
+    # Гистограмма задержек в JSON: число запросов по LATENCY_BUCKETS_MS
+    latency_hist = Column(String, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("hour", "query", name="uq_search_rollups_hour"),
+    )
 
 
 class AdminUser(Base):
@@ -71,3 +152,30 @@ class AdminUser(Base):
     added_at = Column(DateTime, default=func.now(), nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     removed_at = Column(DateTime, nullable=True)
+
+
+class MediaFile(Base):
+    __tablename__ = "media_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False, index=True)
+    file_id = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), nullable=False)
+
+
+class LinkReaction(Base):
+    __tablename__ = "link_reactions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(String, nullable=False)
+    message_id = Column(Integer, nullable=False)
+    user_id = Column(String, nullable=False)
+    # True — лайк, False — дизлайк
+    is_like = Column(Boolean, nullable=False)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+
+    # Один голос пользователя за сообщение
+    __table_args__ = (
+        UniqueConstraint("chat_id", "message_id", "user_id",
+                         name="uq_link_reactions_vote"),
+    )
@@ -33,6 +33,15 @@ COMMAND_DEFINITIONS: List[Dict[str, Any]] = [
         "visible_in_help": True,
         "is_admin": True,  # Только для администраторов
     },
+    {
+        "command": "announce_status",
+        "description": "Состояние последней рассылки",
+        "flag": flags.ANNOUNCE_ENABLE,
+        "private_chat": True,
+        "group_chat": False,
+        "visible_in_help": True,
+        "is_admin": True,
+    },
     {
         "command": "search",
         "description": "Спросить chatGPT о тестировании",
@@ -42,6 +51,15 @@ COMMAND_DEFINITIONS: List[Dict[str, Any]] = [
         "visible_in_help": True,
         "is_admin": False,
     },
+    {
+        "command": "search_stats",
+        "description": "Статистика запросов /search",
+        "flag": flags.SEARCH_STATS_ENABLE,
+        "private_chat": True,
+        "group_chat": False,
+        "visible_in_help": True,
+        "is_admin": True,
+    },
     {
         "command": "add_chat",
         "description": "Добавить чат в список рассылки анонсов",
@@ -87,6 +105,15 @@ COMMAND_DEFINITIONS: List[Dict[str, Any]] = [
         "visible_in_help": True,
         "is_admin": False,
     },
+    {
+        "command": "revoke_access",
+        "description": "Отозвать доступ администратора",
+        "flag": flags.REVOKE_ACCESS_ENABLE,
+        "private_chat": True,
+        "group_chat": False,
+        "visible_in_help": True,
+        "is_admin": True,
+    },
     # Новая команда для администраторов:
     {
         "command": "chat_list",
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy import select, update
+
+from bot.config.settings import ADMIN_ACL_REFRESH_INTERVAL
+from bot.database import SessionLocal
+from bot.models import AdminUser
+
+logger = logging.getLogger(__name__)
+
+
+class AdminACL:
+    """
+    Список активных администраторов в памяти. Загружается на старте
+    и обновляется при выдаче и отзыве прав через grant и revoke.
+    Раз в refresh_interval секунд список перечитывается из БД, чтобы
+    учесть изменения, сделанные в обход бота. Проверка прав — поиск
+    в множестве, без запроса к базе.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._admins: Set[str] = set()
+        self._worker: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._admins)
+
+    def is_admin(self, user_id) -> bool:
+        return str(user_id) in self._admins
+
+    async def load(self) -> None:
+        """
+        Перечитывает активных администраторов из БД. При ошибке
+        остаётся прежний список.
+        """
+        async with SessionLocal() as session:
+            try:
+                rows = await session.scalars(select(AdminUser.user_id).where(
+                    AdminUser.is_active.is_(True)))
+                self._admins = set(rows)
+            except Exception as e:
+                logger.error(f"Ошибка загрузки администраторов: {e}")
+                return
+        logger.debug(f"Загружено администраторов: {len(self._admins)}")
+
+    def grant(self, user_id) -> None:
+        """
+        Добавляет администратора в кэш (после записи в БД).
+        """
+        self._admins.add(str(user_id))
+
+    async def revoke(self, user_id) -> bool:
+        """
+        Отзывает права: помечает запись в БД неактивной
+        и убирает пользователя из кэша.
+        :return: True, если права были
+        """
+        user_id = str(user_id)
+        async with SessionLocal() as session:
+            try:
+                result = await session.execute(
+                    update(AdminUser)
+                    .where(AdminUser.user_id == user_id,
+                           AdminUser.is_active.is_(True))
+                    .values(is_active=False))
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Ошибка отзыва прав {user_id}: {e}")
+                raise
+        self._admins.discard(user_id)
+        return result.rowcount > 0
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.load()
+
+    async def start(self) -> None:
+        await self.load()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+
+admin_acl = AdminACL(refresh_interval=ADMIN_ACL_REFRESH_INTERVAL)
+
+
+class AdminMiddleware(BaseMiddleware):
+    """
+    Передаёт обработчикам признак администратора в параметре is_admin.
+    """
+
+    def __init__(self, acl: AdminACL):
+        self.acl = acl
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]],
+                              Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]) -> Any:
+        user = data.get("event_from_user")
+        data["is_admin"] = user is not None and self.acl.is_admin(user.id)
+        return await handler(event, data)
@@ -0,0 +1,344 @@
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import (
+    InputMediaAudio,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+    Message
+)
+from sqlalchemy import func, insert, select, update
+
+from bot.config.settings import BROADCAST_PROGRESS_INTERVAL
+from bot.database import SessionLocal
+from bot.models import AnnounceDelivery, AnnounceJob
+from bot.utils.broadcast import BroadcastProgress, Step, broadcaster
+from bot.utils.chat_manager import migrate_chat, remove_chat
+from bot.utils.edit_coalescer import EditCoalescer
+
+logger = logging.getLogger(__name__)
+
+# Статусы, с которыми задание подхватывается после перезапуска
+UNFINISHED_STATUSES = ("pending", "running")
+
+# Сколько неудачных чатов перечислять в отчёте
+MAX_LISTED_FAILURES = 10
+
+# Медиа рассылки: тип -> метод Bot для отправки одного файла
+MEDIA_SENDERS = {
+    "photo": "send_photo",
+    "video": "send_video",
+    "animation": "send_animation",
+    "document": "send_document",
+    "audio": "send_audio",
+}
+
+# Типы медиа, которые могут входить в альбом
+MEDIA_GROUP_TYPES = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "document": InputMediaDocument,
+    "audio": InputMediaAudio,
+}
+
+
+def message_media(message: Message) -> Optional[Dict[str, Any]]:
+    """
+    Медиа сообщения в виде {"type", "file_id"}. Файл уже загружен
+    в Telegram, поэтому рассылка отправляет его по file_id.
+    """
+    if message.photo:
+        return {"type": "photo", "file_id": message.photo[-1].file_id}
+    # animation проверяется раньше document: у гифок заполнены оба поля
+    for kind in ("video", "animation", "document", "audio"):
+        media = getattr(message, kind)
+        if media is not None:
+            return {"type": kind, "file_id": media.file_id}
+    return None
+
+
+async def create_job(created_by: str,
+                     text: Optional[str],
+                     source: Optional[Tuple[str, int]],
+                     status_message: Optional[Tuple[str, int]],
+                     chats: Iterable[Tuple[str, str]],
+                     media: Optional[List[Dict[str, Any]]] = None) -> int:
+    """
+    Сохраняет задание рассылки и по строке доставки на каждый чат.
+    :param created_by: user_id администратора
+    :param text: Текст рассылки
+    :param source: (chat_id, message_id) копируемого сообщения
+    :param status_message: (chat_id, message_id) сообщения о ходе рассылки
+    :param chats: Пары (chat_id, название чата)
+    :param media: Файлы рассылки (один файл или альбом)
+    :return: Идентификатор задания
+    """
+    source_chat_id, source_message_id = source or (None, None)
+    status_chat_id, status_message_id = status_message or (None, None)
+    async with SessionLocal() as session:
+        job = AnnounceJob(created_by=created_by, text=text,
+                          source_chat_id=source_chat_id,
+                          source_message_id=source_message_id,
+                          status_chat_id=status_chat_id,
+                          status_message_id=status_message_id,
+                          media=json.dumps(media, ensure_ascii=False)
+                          if media else None)
+        session.add(job)
+        await session.flush()
+        await session.execute(insert(AnnounceDelivery), [
+            {"job_id": job.id, "chat_id": chat_id, "chat_title": title}
+            for chat_id, title in chats])
+        await session.commit()
+        return job.id
+
+
+async def get_job(job_id: Optional[int] = None) -> Optional[AnnounceJob]:
+    """
+    Возвращает задание по id, а без id — последнее созданное.
+    """
+    async with SessionLocal() as session:
+        if job_id is not None:
+            return await session.get(AnnounceJob, job_id)
+        return await session.scalar(
+            select(AnnounceJob).order_by(AnnounceJob.id.desc()).limit(1))
+
+
+async def update_job(job_id: int, **fields) -> None:
+    async with SessionLocal() as session:
+        await session.execute(update(AnnounceJob)
+                              .where(AnnounceJob.id == job_id)
+                              .values(**fields))
+        await session.commit()
+
+
+async def job_counts(job_id: int) -> Dict[str, int]:
+    """
+    Количество доставок задания по статусам.
+    """
+    async with SessionLocal() as session:
+        rows = await session.execute(
+            select(AnnounceDelivery.status, func.count())
+            .where(AnnounceDelivery.job_id == job_id)
+            .group_by(AnnounceDelivery.status))
+        return {status: count for status, count in rows}
+
+
+async def job_failures(job_id: int) -> List[AnnounceDelivery]:
+    async with SessionLocal() as session:
+        return (await session.scalars(
+            select(AnnounceDelivery)
+            .where(AnnounceDelivery.job_id == job_id,
+                   AnnounceDelivery.status == "failed")
+            .order_by(AnnounceDelivery.id))).all()
+
+
+async def pending_chats(job_id: int) -> List[str]:
+    """
+    Чаты, в которые задание ещё не доставлено, в исходном порядке.
+    """
+    async with SessionLocal() as session:
+        return (await session.scalars(
+            select(AnnounceDelivery.chat_id)
+            .where(AnnounceDelivery.job_id == job_id,
+                   AnnounceDelivery.status == "pending")
+            .order_by(AnnounceDelivery.id))).all()
+
+
+async def record_delivery(job_id: int, chat_id: str,
+                          error: Optional[Exception]) -> None:
+    async with SessionLocal() as session:
+        await session.execute(
+            update(AnnounceDelivery)
+            .where(AnnounceDelivery.job_id == job_id,
+                   AnnounceDelivery.chat_id == chat_id)
+            .values(status="sent" if error is None else "failed",
+                    error=None if error is None else str(error)[:500],
+                    delivered_at=datetime.utcnow()))
+        await session.commit()
+
+
+async def prune_chat(progress: BroadcastProgress, chat_id: str) -> None:
+    """
+    Обновляет список чатов по итогам отправки: чаты, куда бот больше
+    не может писать, помечаются удалёнными, а у групп, ставших
+    супергруппами, записывается новый chat_id. Следующие рассылки
+    не тратят на такие чаты время и запросы.
+    """
+    if chat_id in progress.dead:
+        await remove_chat(chat_id, "announce")
+    elif chat_id in progress.migrations:
+        await migrate_chat(chat_id, progress.migrations[chat_id])
+
+
+def media_step(bot: Bot, media: List[Dict[str, Any]]) -> Step:
+    """
+    Отправка медиа по file_id: один файл — своим методом,
+    несколько — одним альбомом.
+    """
+    if len(media) == 1:
+        item = media[0]
+        send = getattr(bot, MEDIA_SENDERS[item["type"]])
+        return lambda chat_id: send(chat_id, item["file_id"],
+                                    caption=item.get("caption"))
+    album = [MEDIA_GROUP_TYPES[item["type"]](media=item["file_id"],
+                                             caption=item.get("caption"))
+             for item in media]
+    return lambda chat_id: bot.send_media_group(chat_id, album)
+
+
+def job_steps(bot: Bot, job: AnnounceJob) -> List[Step]:
+    """
+    Запросы рассылки для одного чата: текст задания, медиа
+    и копия исходного сообщения. Копия, в отличие от пересылки,
+    отправляется без подписи «Переслано от» и без повторной загрузки
+    файлов.
+    """
+    steps: List[Step] = []
+    if job.text:
+        steps.append(lambda chat_id: bot.send_message(chat_id, job.text))
+    if job.media:
+        steps.append(media_step(bot, json.loads(job.media)))
+    if job.source_message_id is not None:
+        steps.append(lambda chat_id: bot.copy_message(
+            chat_id, job.source_chat_id, job.source_message_id))
+    return steps
+
+
+def format_progress(counts: Dict[str, int]) -> str:
+    total = sum(counts.values())
+    return (f"Рассылка: отправлено {counts.get('sent', 0)}, "
+            f"ошибок {counts.get('failed', 0)}, "
+            f"осталось {counts.get('pending', 0)} из {total}.")
+
+
+def job_duration(job: AnnounceJob) -> Optional[float]:
+    if job.started_at is None:
+        return None
+    end = job.finished_at or datetime.utcnow()
+    return (end - job.started_at).total_seconds()
+
+
+async def format_job_report(job: AnnounceJob) -> str:
+    """
+    Отчёт по заданию: статус, счётчики, длительность
+    и чаты, в которые рассылка не дошла.
+    """
+    counts = await job_counts(job.id)
+    lines = [f"Рассылка #{job.id} ({job.status}), "
+             f"создана {job.created_at:%d.%m.%Y %H:%M}.",
+             format_progress(counts)]
+    duration = job_duration(job)
+    if duration is not None:
+        lines.append(f"Длительность: {duration:.1f} с.")
+    failures = await job_failures(job.id)
+    for delivery in failures[:MAX_LISTED_FAILURES]:
+        title = delivery.chat_title or delivery.chat_id
+        lines.append(f"• {title}: {delivery.error}")
+    if len(failures) > MAX_LISTED_FAILURES:
+        lines.append(f"… и ещё {len(failures) - MAX_LISTED_FAILURES}")
+    return "\n".join(lines)
+
+
+class AnnounceJobRunner:
+    """
+    Выполняет задания рассылки в фоне. Результат по каждому чату
+    сразу пишется в БД, поэтому после перезапуска задание продолжается
+    с первого недоставленного чата и не отправляется повторно туда,
+    куда уже дошло.
+    """
+
+    def __init__(self, progress_interval: float):
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._progress_edits = EditCoalescer(window=progress_interval)
+
+    def start(self, bot: Bot, job_id: int) -> None:
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(bot, job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def resume(self, bot: Bot) -> int:
+        """
+        Запускает незавершённые задания (при старте бота).
+        :return: Количество возобновлённых заданий
+        """
+        async with SessionLocal() as session:
+            job_ids = (await session.scalars(
+                select(AnnounceJob.id)
+                .where(AnnounceJob.status.in_(UNFINISHED_STATUSES))
+                .order_by(AnnounceJob.id))).all()
+        for job_id in job_ids:
+            logger.info(f"Возобновление рассылки #{job_id}")
+            self.start(bot, job_id)
+        return len(job_ids)
+
+    async def _edit_status(self, bot: Bot, job: AnnounceJob,
+                           text: str) -> None:
+        if job.status_message_id is None:
+            return
+        try:
+            await bot.edit_message_text(text,
+                                        chat_id=job.status_chat_id,
+                                        message_id=job.status_message_id)
+        except TelegramBadRequest as e:
+            logger.debug(f"Сообщение о рассылке #{job.id} "
+                         f"не обновлено: {e.message}")
+
+    async def _run(self, bot: Bot, job_id: int) -> None:
+        try:
+            await self._execute(bot, job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Задание остаётся незавершённым и продолжится после перезапуска
+            logger.error(f"Ошибка выполнения рассылки #{job_id}: {e}")
+
+    async def _execute(self, bot: Bot, job_id: int) -> None:
+        job = await get_job(job_id)
+        if job.started_at is None:
+            job.started_at = datetime.utcnow()
+        await update_job(job_id, status="running", started_at=job.started_at)
+        counts = await job_counts(job_id)
+
+        async def on_result(progress: BroadcastProgress, chat_id: str,
+                            error: Optional[Exception]) -> None:
+            await record_delivery(job_id, chat_id, error)
+            await prune_chat(progress, chat_id)
+            counts["pending"] -= 1
+            key = "sent" if error is None else "failed"
+            counts[key] = counts.get(key, 0) + 1
+            self._progress_edits.request(
+                job_id,
+                lambda: self._edit_status(bot, job, format_progress(counts)))
+
+        await broadcaster.run(await pending_chats(job_id),
+                              job_steps(bot, job),
+                              on_result=on_result)
+        self._progress_edits.discard(job_id)
+        job.status = "done"
+        job.finished_at = datetime.utcnow()
+        await update_job(job_id, status=job.status,
+                         finished_at=job.finished_at)
+        await self._edit_status(bot, job, await format_job_report(job))
+
+    async def stop(self) -> None:
+        """
+        Прерывает выполняемые задания; они продолжатся при следующем
+        запуске бота.
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._progress_edits.close()
+
+
+announce_runner = AnnounceJobRunner(
+    progress_interval=BROADCAST_PROGRESS_INTERVAL)
@@ -0,0 +1,165 @@
+import re
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Эмбеддинг текста: нормализованный вектор
+Embed = Callable[[str], Awaitable[np.ndarray]]
+
+# Политики вытеснения: lru — дольше всех не запрашивавшийся ответ,
+# fifo — самый старый
+EVICTION_POLICIES = ("lru", "fifo")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Приводит запрос к виду для точного сравнения: нижний регистр,
+    только слова, одиночные пробелы.
+    """
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    expires_at: float
+    vector: Optional[np.ndarray] = None
+
+
+@dataclass
+class CacheLookup:
+    """
+    Результат поиска в кэше.
+    :param answer: Найденный ответ или None
+    :param tier: "exact", "semantic" или None при промахе
+    :param vector: Эмбеддинг запроса (чтобы не считать его при записи)
+    """
+    answer: Optional[str] = None
+    tier: Optional[str] = None
+    vector: Optional[np.ndarray] = None
+
+
+class AnswerCache:
+    """
+    Кэш ответов /search из двух уровней. Первый — точное совпадение
+    нормализованного текста запроса. Второй (если задан embed) —
+    смысловая близость: ответ на похожий запрос отдаётся, если
+    косинусное сходство не ниже semantic_threshold.
+    :param max_size: Максимальное число ответов
+    :param ttl: Время жизни ответа в секундах
+    :param policy: Политика вытеснения при переполнении (lru или fifo)
+    :param embed: Корутина, возвращающая нормализованный эмбеддинг
+    :param semantic_threshold: Порог сходства для второго уровня
+    """
+
+    def __init__(self, max_size: int, ttl: float, policy: str = "lru",
+                 embed: Optional[Embed] = None,
+                 semantic_threshold: float = 0.92):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Неизвестная политика вытеснения: {policy}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.policy = policy
+        self.embed = embed
+        self.semantic_threshold = semantic_threshold
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        # Матрица эмбеддингов для второго уровня, строится по требованию
+        self._keys: list = []
+        self._matrix: Optional[np.ndarray] = None
+        self.counters: Dict[str, int] = {"exact_hits": 0,
+                                         "semantic_hits": 0,
+                                         "misses": 0,
+                                         "evicted": 0,
+                                         "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: str, counter: str) -> None:
+        del self._entries[key]
+        self._matrix = None
+        self.counters[counter] += 1
+
+    def _get_exact(self, key: str) -> Optional[CachedAnswer]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._drop(key, "expired")
+            return None
+        if self.policy == "lru":
+            self._entries.move_to_end(key)
+        return entry
+
+    def _semantic_matrix(self):
+        if self._matrix is None:
+            now = time.monotonic()
+            self._keys = [key for key, entry in self._entries.items()
+                          if entry.vector is not None
+                          and entry.expires_at > now]
+            self._matrix = (np.stack([self._entries[key].vector
+                                      for key in self._keys])
+                            if self._keys else None)
+        return self._matrix
+
+    async def _embed(self, query: str) -> Optional[np.ndarray]:
+        if self.embed is None:
+            return None
+        try:
+            return await self.embed(query)
+        except Exception as e:
+            logger.error(f"Ошибка эмбеддинга запроса для кэша: {e}")
+            return None
+
+    def _get_semantic(self, vector: np.ndarray) -> Optional[CachedAnswer]:
+        matrix = self._semantic_matrix()
+        if matrix is None:
+            return None
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.semantic_threshold:
+            return None
+        logger.debug(f"Похожий запрос в кэше ({scores[best]:.2f}): "
+                     f"{self._keys[best]}")
+        return self._get_exact(self._keys[best])
+
+    async def lookup(self, query: str) -> CacheLookup:
+        """
+        Ищет ответ сначала по точному тексту, затем по смыслу.
+        """
+        entry = self._get_exact(normalize_query(query))
+        if entry is not None:
+            self.counters["exact_hits"] += 1
+            return CacheLookup(entry.answer, "exact")
+        vector = await self._embed(query)
+        entry = self._get_semantic(vector) if vector is not None else None
+        if entry is not None:
+            self.counters["semantic_hits"] += 1
+            return CacheLookup(entry.answer, "semantic", vector)
+        self.counters["misses"] += 1
+        return CacheLookup(vector=vector)
+
+    def store(self, query: str, answer: str,
+              vector: Optional[np.ndarray] = None) -> None:
+        """
+        Сохраняет ответ. Лишние записи вытесняются по политике.
+        """
+        key = normalize_query(query)
+        if not key:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = CachedAnswer(answer,
+                                          time.monotonic() + self.ttl,
+                                          vector)
+        self._matrix = None
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)), "evicted")
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), **self.counters}
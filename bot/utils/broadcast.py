@@ -0,0 +1,238 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import (
+    Any, Awaitable, Callable, Dict, Iterable, Optional, Sequence, Set
+)
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramMigrateToChat,
+    TelegramRetryAfter
+)
+
+from bot.utils.outbound import BROADCAST, outbound_priority
+from bot.config.settings import (
+    BROADCAST_RATE,
+    BROADCAST_PER_CHAT_INTERVAL,
+    BROADCAST_WORKERS,
+    BROADCAST_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+# Один запрос рассылки в конкретный чат: принимает chat_id
+Step = Callable[[str], Awaitable[Any]]
+
+
+def is_dead_chat_error(error: Exception) -> bool:
+    """
+    Ошибка означает, что в чат больше нельзя писать: бота удалили
+    или заблокировали (Forbidden), либо чат не существует.
+    """
+    if isinstance(error, TelegramForbiddenError):
+        return True
+    return (isinstance(error, TelegramBadRequest)
+            and "chat not found" in (error.message or "").lower())
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов: не больше rate запросов в секунду
+    с запасом capacity на короткие всплески.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _delay(self) -> float:
+        """
+        Сколько ждать до следующего запроса (0 — можно отправлять).
+        """
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        # Ожидающие обслуживаются по очереди, в порядке прихода
+        async with self._lock:
+            delay = self._delay()
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = self._delay()
+            self._tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """
+        Останавливает выдачу на seconds секунд (после ответа 429).
+        """
+        self._paused_until = max(self._paused_until,
+                                 time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+@dataclass
+class BroadcastProgress:
+    total: int
+    sent: int = 0
+    failed: int = 0
+    # chat_id -> текст ошибки
+    failures: Dict[str, str] = field(default_factory=dict)
+    # Чаты, в которые больше нельзя писать
+    dead: Set[str] = field(default_factory=set)
+    # Группы, ставшие супергруппами: старый chat_id -> новый
+    migrations: Dict[str, str] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def pending(self) -> int:
+        return self.total - self.sent - self.failed
+
+    @property
+    def duration(self) -> float:
+        end = self.finished_at or time.monotonic()
+        return end - self.started_at
+
+
+# Вызывается после обработки каждого чата: (прогресс, chat_id, ошибка)
+ResultCallback = Callable[[BroadcastProgress, str, Optional[Exception]],
+                          Awaitable[None]]
+
+
+class Broadcaster:
+    """
+    Рассылка в много чатов пулом из workers задач.
+    Общая частота запросов ограничена rate в секунду (у Telegram лимит
+    около 30 сообщений в секунду), запросы в один чат идут не чаще
+    раза в per_chat_interval секунд. На TelegramRetryAfter рассылка
+    приостанавливается на указанное время и запрос повторяется.
+    Если группа стала супергруппой, запрос повторяется с новым chat_id,
+    а замена записывается в прогресс.
+    """
+
+    def __init__(self, rate: float, per_chat_interval: float,
+                 workers: int, max_retries: int):
+        self.per_chat_interval = per_chat_interval
+        self.workers = workers
+        self.max_retries = max_retries
+        self._bucket = TokenBucket(rate)
+        self._chat_ready_at: Dict[str, float] = {}
+
+    async def _throttle_chat(self, chat_id: str) -> None:
+        delay = self._chat_ready_at.get(chat_id, 0.0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._chat_ready_at[chat_id] = (time.monotonic()
+                                        + self.per_chat_interval)
+
+    async def _send(self, chat_id: str, step: Step) -> str:
+        """
+        Выполняет один запрос с учётом лимитов и повторами после 429.
+        :return: chat_id, по которому запрос дошёл (после миграции — новый)
+        """
+        for attempt in range(self.max_retries + 1):
+            await self._throttle_chat(chat_id)
+            await self._bucket.acquire()
+            try:
+                await step(chat_id)
+                return chat_id
+            except (TelegramMigrateToChat, TelegramRetryAfter) as e:
+                if attempt == self.max_retries:
+                    raise
+                chat_id = self._recover(chat_id, e)
+
+    def _recover(self, chat_id: str, error: Exception) -> str:
+        """
+        Готовит повтор запроса после миграции чата или ответа 429.
+        :return: chat_id для повтора
+        """
+        if isinstance(error, TelegramMigrateToChat):
+            logger.info(f"Чат {chat_id} стал супергруппой "
+                        f"{error.migrate_to_chat_id}")
+            return str(error.migrate_to_chat_id)
+        logger.warning(f"Рассылка: лимит Telegram, пауза "
+                       f"{error.retry_after} с (чат {chat_id})")
+        self._bucket.pause(error.retry_after)
+        self._chat_ready_at[chat_id] = time.monotonic() + error.retry_after
+        return chat_id
+
+    async def _deliver(self, chat_id: str, steps: Sequence[Step],
+                       progress: BroadcastProgress) -> Optional[Exception]:
+        target = chat_id
+        try:
+            for step in steps:
+                target = await self._send(target, step)
+        except Exception as e:
+            logger.warning(f"Не удалось отправить рассылку "
+                           f"в чат {target}: {e}")
+            if is_dead_chat_error(e):
+                progress.dead.add(chat_id)
+            return e
+        finally:
+            if target != chat_id:
+                progress.migrations[chat_id] = target
+        return None
+
+    async def _worker(self, queue: asyncio.Queue, steps: Sequence[Step],
+                      progress: BroadcastProgress,
+                      on_result: Optional[ResultCallback]) -> None:
+        # Рассылка уступает в общей очереди ответам пользователям
+        outbound_priority.set(BROADCAST)
+        while not queue.empty():
+            chat_id = queue.get_nowait()
+            error = await self._deliver(chat_id, steps, progress)
+            if error is None:
+                progress.sent += 1
+            else:
+                progress.failed += 1
+                progress.failures[chat_id] = str(error)
+            if on_result is not None:
+                await on_result(progress, chat_id, error)
+
+    async def run(self, chat_ids: Iterable[str], steps: Sequence[Step],
+                  on_result: Optional[ResultCallback] = None
+                  ) -> BroadcastProgress:
+        """
+        Отправляет steps по очереди в каждый чат из chat_ids.
+        :param chat_ids: Идентификаторы чатов
+        :param steps: Запросы, выполняемые для каждого чата по порядку
+        :param on_result: Корутина, вызываемая после каждого чата
+        :return: Итоговый прогресс рассылки
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for chat_id in chat_ids:
+            queue.put_nowait(str(chat_id))
+        progress = BroadcastProgress(total=queue.qsize())
+        await asyncio.gather(*(
+            self._worker(queue, steps, progress, on_result)
+            for _ in range(min(self.workers, progress.total))))
+        progress.finished_at = time.monotonic()
+        # Ограничения по чатам нужны только для идущих рассылок
+        now = time.monotonic()
+        self._chat_ready_at = {chat_id: ready_at for chat_id, ready_at
+                               in self._chat_ready_at.items()
+                               if ready_at > now}
+        return progress
+
+
+broadcaster = Broadcaster(rate=BROADCAST_RATE,
+                          per_chat_interval=BROADCAST_PER_CHAT_INTERVAL,
+                          workers=BROADCAST_WORKERS,
+                          max_retries=BROADCAST_MAX_RETRIES)
@@ -1,14 +1,34 @@
 import logging
 from datetime import datetime
+from typing import FrozenSet, Set
 
-from aiogram.types import Message
+from aiogram import Bot
+from aiogram.types import ChatMemberUpdated, Message
+from sqlalchemy import select
+
+from bot.config.settings import CHAT_ADMINS_TTL, CHAT_ADMINS_CACHE_SIZE
 from bot.database import SessionLocal
 from bot.models import Chat
+from bot.utils.concurrency import SingleFlight
+from bot.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Администраторы чатов: (chat_id, "admins") -> frozenset из user_id.
+# Сбрасываются по обновлениям chat_member и my_chat_member
+chat_admins = TTLCache(ttl=CHAT_ADMINS_TTL, max_size=CHAT_ADMINS_CACHE_SIZE)
+_ADMINS_KEY = "admins"
+# Одновременные проверки в одном чате ждут один запрос к Bot API
+admin_lookups = SingleFlight()
+# Чаты, для которых идёт запрос списка администраторов, и те из них,
+# чей кэш сбросили во время запроса (их ответ может быть устаревшим)
+_admin_fetches: Set[int] = set()
+_stale_admin_fetches: Set[int] = set()
+# Статусы участника с правами администратора
+ADMIN_STATUSES = ("administrator", "creator")
+
 
-def add_chat(chat_id: int, chat_title: str, added_by: str) -> None:
+async def add_chat(chat_id: int, chat_title: str, added_by: str) -> None:
     """
     Добавляет чат в базу данных или восстанавливает его,
     если он ранее был помечен как удалённый.
@@ -17,42 +37,41 @@ def add_chat(chat_id: int, chat_title: str, added_by: str) -> None:
     :param chat_title: Название чата.
     :param added_by: Имя или username пользователя, добавившего чат.
     """
-    session = SessionLocal()
-    try:
-        # Приводим chat_id к строке для единообразия хранения
-        existing_chat = (session.query(Chat)
-                         .filter(Chat.chat_id == str(chat_id)).first())
-        if existing_chat:
-            if existing_chat.deleted:
-                existing_chat.deleted = False
-                existing_chat.deleted_by = None
-                existing_chat.deleted_at = None
-                session.commit()
-                logger.info(f"Чат {chat_id} восстановлен.")
-            else:
-                logger.debug(f"Чат {chat_id} уже существует в базе данных.")
-            return
-
-        new_chat = Chat(
-            chat_id=str(chat_id),
-            title=chat_title,
-            added_by=added_by,
-            added_at=datetime.now(),
-            deleted=False
-        )
-        session.add(new_chat)
-        session.commit()
-        logger.info(f"Чат {chat_id} ({chat_title}) добавлен в "
-                    f"базу данных пользователем {added_by}.")
-    except Exception as e:
-        session.rollback()
-        logger.error(f"Ошибка при добавлении чата {chat_id}: {e}")
-        raise
-    finally:
-        session.close()
+    async with SessionLocal() as session:
+        try:
+            # Приводим chat_id к строке для единообразия хранения
+            existing_chat = await session.scalar(
+                select(Chat).where(Chat.chat_id == str(chat_id)))
+            if existing_chat:
+                if existing_chat.deleted:
+                    existing_chat.deleted = False
+                    existing_chat.deleted_by = None
+                    existing_chat.deleted_at = None
+                    await session.commit()
+                    logger.info(f"Чат {chat_id} восстановлен.")
+                else:
+                    logger.debug(f"Чат {chat_id} уже существует "
+                                 f"в базе данных.")
+                return
+
+            new_chat = Chat(
+                chat_id=str(chat_id),
+                title=chat_title,
+                added_by=added_by,
+                added_at=datetime.now(),
+                deleted=False
+            )
+            session.add(new_chat)
+            await session.commit()
+            logger.info(f"Чат {chat_id} ({chat_title}) добавлен в "
+                        f"базу данных пользователем {added_by}.")
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Ошибка при добавлении чата {chat_id}: {e}")
+            raise
 
 
-def remove_chat(chat_id: int, removed_by: str) -> bool:
+async def remove_chat(chat_id: int, removed_by: str) -> bool:
     """
     Помечает чат как удалённый в базе данных.
 
@@ -60,30 +79,103 @@ def remove_chat(chat_id: int, removed_by: str) -> bool:
     :param removed_by: Имя или username пользователя, инициировавшего удаление.
     :return: True, если чат найден и успешно помечен, иначе False.
     """
-    session = SessionLocal()
-    try:
-        chat = session.query(Chat).filter(Chat.chat_id == str(chat_id)).first()
-        if not chat:
-            logger.debug(f"Чат {chat_id} не найден в базе данных.")
+    async with SessionLocal() as session:
+        try:
+            chat = await session.scalar(
+                select(Chat).where(Chat.chat_id == str(chat_id)))
+            if not chat:
+                logger.debug(f"Чат {chat_id} не найден в базе данных.")
+                return False
+            if chat.deleted:
+                logger.debug(f"Чат {chat_id} ({chat.title}) уже "
+                             f"помечен как удалённый.")
+                return False
+
+            chat.deleted = True
+            chat.deleted_by = removed_by
+            chat.deleted_at = datetime.utcnow()
+            await session.commit()
+            logger.info(f"Чат {chat_id} ({chat.title}) помечен "
+                        f"как удалённый пользователем {removed_by}.")
+            return True
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Ошибка при удалении чата {chat_id}: {e}")
             return False
-        if chat.deleted:
-            logger.debug(f"Чат {chat_id} ({chat.title}) уже "
-                         f"помечен как удалённый.")
+
+
+async def migrate_chat(old_chat_id, new_chat_id) -> bool:
+    """
+    Заменяет chat_id группы, ставшей супергруппой, на новый.
+    Если новый чат уже есть в базе, старая запись помечается удалённой.
+
+    :param old_chat_id: Прежний идентификатор чата.
+    :param new_chat_id: Идентификатор супергруппы.
+    :return: True, если запись чата обновлена, иначе False.
+    """
+    async with SessionLocal() as session:
+        try:
+            chat = await session.scalar(
+                select(Chat).where(Chat.chat_id == str(old_chat_id)))
+            if not chat:
+                logger.debug(f"Чат {old_chat_id} не найден в базе данных.")
+                return False
+            duplicate = await session.scalar(
+                select(Chat.id).where(Chat.chat_id == str(new_chat_id)))
+            if duplicate is not None:
+                logger.info(f"Чат {new_chat_id} уже в базе данных, "
+                            f"старая запись {old_chat_id} удаляется.")
+                return await remove_chat(old_chat_id, "migration")
+
+            chat.chat_id = str(new_chat_id)
+            await session.commit()
+            logger.info(f"Чат {chat.title} перенесён: {old_chat_id} -> "
+                        f"{new_chat_id}.")
+            return True
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Ошибка при переносе чата {old_chat_id}: {e}")
             return False
 
-        chat.deleted = True
-        chat.deleted_by = removed_by
-        chat.deleted_at = datetime.utcnow()
-        session.commit()
-        logger.info(f"Чат {chat_id} ({chat.title}) помечен "
-                    f"как удалённый пользователем {removed_by}.")
-        return True
-    except Exception as e:
-        session.rollback()
-        logger.error(f"Ошибка при удалении чата {chat_id}: {e}")
-        return False
+
+async def _fetch_chat_admin_ids(bot: Bot, chat_id: int) -> FrozenSet[int]:
+    """
+    Запрашивает администраторов у Bot API и кладёт список в кэш,
+    если за время запроса кэш чата не сбрасывали.
+    """
+    _admin_fetches.add(chat_id)
+    try:
+        administrators = await bot.get_chat_administrators(chat_id)
     finally:
-        session.close()
+        _admin_fetches.discard(chat_id)
+        stale = chat_id in _stale_admin_fetches
+        _stale_admin_fetches.discard(chat_id)
+    admin_ids = frozenset(admin.user.id for admin in administrators)
+    if stale:
+        logger.debug(f"Список администраторов чата {chat_id} изменился "
+                     f"во время запроса, в кэш не сохраняется.")
+    else:
+        chat_admins.set(chat_id, _ADMINS_KEY, admin_ids)
+    return admin_ids
+
+
+async def get_chat_admin_ids(bot: Bot, chat_id: int) -> FrozenSet[int]:
+    """
+    Возвращает user_id администраторов чата. Список берётся из кэша,
+    а при промахе запрашивается у Bot API.
+    """
+    admin_ids = chat_admins.get(chat_id, _ADMINS_KEY)
+    if admin_ids is None:
+        admin_ids = await admin_lookups.do(
+            chat_id, lambda: _fetch_chat_admin_ids(bot, chat_id))
+    return admin_ids
+
+
+def forget_chat_admins(chat_id: int) -> None:
+    if chat_id in _admin_fetches:
+        _stale_admin_fetches.add(chat_id)
+    if chat_admins.pop(chat_id, _ADMINS_KEY):
+        logger.debug(f"Список администраторов чата {chat_id} сброшен.")
 
 
 async def is_user_admin(message: Message) -> bool:
@@ -94,29 +186,52 @@ async def is_user_admin(message: Message) -> bool:
     :return: True, если пользователь является администратором, иначе False.
     """
     try:
-        chat_administrators = await message.bot.get_chat_administrators(
-            message.chat.id)
-        return any(admin.user.id == message.from_user.id
-                   for admin in chat_administrators)
+        admin_ids = await get_chat_admin_ids(message.bot, message.chat.id)
+        return message.from_user.id in admin_ids
     except Exception as e:
         logger.error(f"Ошибка при проверке администратора: {e}")
         return False
 
 
-def get_all_chats():
-    session = SessionLocal()
-    try:
-        chats = session.query(Chat).all()
-        result = []
-        for chat in chats:
-            result.append({
-                "chat_id": chat.chat_id,
-                "title": chat.title,
-                "deleted": chat.deleted
-            })
-        return result
-    except Exception as e:
-        logger.error(f"Ошибка при получении списка чатов: {e}")
-        return []
-    finally:
-        session.close()
+async def handle_chat_member_update(event: ChatMemberUpdated) -> None:
+    """
+    Сбрасывает кэш администраторов, если участника назначили
+    администратором или лишили прав.
+    """
+    if (event.old_chat_member.status in ADMIN_STATUSES
+            or event.new_chat_member.status in ADMIN_STATUSES):
+        forget_chat_admins(event.chat.id)
+
+
+async def handle_my_chat_member_update(event: ChatMemberUpdated) -> None:
+    """
+    Сбрасывает кэш администраторов при изменении прав самого бота
+    (в том числе при удалении из чата).
+    """
+    forget_chat_admins(event.chat.id)
+
+
+async def get_all_chats():
+    async with SessionLocal() as session:
+        try:
+            chats = (await session.scalars(select(Chat))).all()
+            result = []
+            for chat in chats:
+                result.append({
+                    "chat_id": chat.chat_id,
+                    "title": chat.title,
+                    "deleted": chat.deleted
+                })
+            return result
+        except Exception as e:
+            logger.error(f"Ошибка при получении списка чатов: {e}")
+            return []
+
+
+def register_chat_admin_handlers(dp) -> None:
+    """
+    Регистрирует обработчики изменений прав участников.
+    Telegram присылает chat_member, только если бот — администратор.
+    """
+    dp.chat_member.register(handle_chat_member_update)
+    dp.my_chat_member.register(handle_my_chat_member_update)
@@ -0,0 +1,103 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Результаты допуска запроса в ConcurrencyLimiter
+ADMITTED = "admitted"  # выполняется сразу
+QUEUED = "queued"  # ждёт свободного места
+USER_BUSY = "user_busy"  # у пользователя уже есть запросы в работе
+OVERLOADED = "overloaded"  # очередь заполнена
+
+
+class SingleFlight:
+    """
+    Объединяет одинаковые одновременные вызовы: пока вызов с ключом
+    выполняется, остальные вызывающие ждут его результат, а не
+    запускают свой.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def join(self, key: Hashable,
+             factory: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """
+        Присоединяется к вызову с ключом key или запускает его.
+        Не ждёт: вызов регистрируется сразу, поэтому проверка
+        in_flight и join без await между ними атомарны.
+        :return: Future с результатом factory()
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Отмена одного из ожидающих не прерывает общий вызов
+        return asyncio.shield(task)
+
+    async def do(self, key: Hashable,
+                 factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Возвращает результат factory() для ключа key. Если такой вызов
+        уже идёт, factory не вызывается.
+        """
+        return await self.join(key, factory)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+class ConcurrencyLimiter:
+    """
+    Ограничивает число запросов: не больше max_per_user одновременно
+    от одного пользователя и не больше max_active тяжёлых запросов
+    на всех, плюс очередь из max_queued ожидающих. Запрос сверх
+    лимитов отклоняется сразу, а не копится.
+    """
+
+    def __init__(self, max_per_user: int, max_active: int, max_queued: int):
+        self.max_per_user = max_per_user
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self._per_user: Dict[Hashable, int] = {}
+        self._heavy = 0
+
+    def admit(self, user_id: Hashable, heavy: bool = True) -> str:
+        """
+        Пытается допустить запрос. При ADMITTED и QUEUED вызывающий
+        обязан потом вызвать release, а для тяжёлого запроса ещё
+        и release_slot.
+        :param heavy: Запрос занимает общее место (а не ждёт чужой)
+        """
+        if self._per_user.get(user_id, 0) >= self.max_per_user:
+            return USER_BUSY
+        if heavy and self._heavy >= self.max_active + self.max_queued:
+            return OVERLOADED
+        queued = heavy and self._heavy >= self.max_active
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        self._heavy += int(heavy)
+        return QUEUED if queued else ADMITTED
+
+    def release(self, user_id: Hashable) -> None:
+        """
+        Освобождает место пользователя.
+        """
+        count = self._per_user.get(user_id, 0) - 1
+        if count > 0:
+            self._per_user[user_id] = count
+        else:
+            self._per_user.pop(user_id, None)
+
+    def release_slot(self) -> None:
+        """
+        Освобождает общее место тяжёлого запроса.
+        """
+        self._heavy -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"heavy": self._heavy,
+                "queued": max(0, self._heavy - self.max_active),
+                "users": len(self._per_user)}
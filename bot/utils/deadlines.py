@@ -0,0 +1,135 @@
+import time
+import heapq
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Действие по истечении срока
+Callback = Callable[[], Awaitable[None]]
+
+
+@dataclass(order=True)
+class _Deadline:
+    when: float
+    seq: int
+    key: Hashable = field(compare=False)
+    callback: Callback = field(compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+class DeadlineScheduler:
+    """
+    Общий планировщик сроков: куча дедлайнов и одна задача, которая
+    спит до ближайшего из них. На каждый ключ — не больше одного
+    дедлайна. Отменённые дедлайны удаляются из кучи лениво, а когда
+    их становится больше живых, куча перестраивается, поэтому память
+    не растёт от брошенных и отменённых сроков.
+    """
+
+    def __init__(self):
+        self._heap: List[_Deadline] = []
+        self._by_key: Dict[Hashable, _Deadline] = {}
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._driver: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def schedule(self, key: Hashable, delay: float,
+                 callback: Callback) -> None:
+        """
+        Назначает вызов callback через delay секунд. Прежний дедлайн
+        с тем же ключом отменяется.
+        """
+        self.cancel(key)
+        self._seq += 1
+        deadline = _Deadline(time.monotonic() + delay, self._seq, key,
+                             callback)
+        self._by_key[key] = deadline
+        heapq.heappush(self._heap, deadline)
+        if self._heap[0] is deadline:
+            self._wakeup.set()
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._run())
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Отменяет дедлайн ключа.
+        :return: True, если дедлайн был назначен
+        """
+        deadline = self._by_key.pop(key, None)
+        if deadline is None:
+            return False
+        deadline.cancelled = True
+        if len(self._heap) > 2 * len(self._by_key) + 64:
+            self._compact()
+        return True
+
+    def _compact(self) -> None:
+        self._heap = [d for d in self._heap if not d.cancelled]
+        heapq.heapify(self._heap)
+
+    def _pop_due(self, now: float) -> Optional[_Deadline]:
+        """
+        Снимает с кучи наступивший дедлайн (или None).
+        """
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+        if not self._heap or self._heap[0].when > now:
+            return None
+        deadline = heapq.heappop(self._heap)
+        del self._by_key[deadline.key]
+        return deadline
+
+    async def _sleep(self) -> None:
+        """
+        Ждёт ближайшего дедлайна или появления более раннего.
+        """
+        self._wakeup.clear()
+        delay = self._heap[0].when - time.monotonic() if self._heap else None
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            deadline = self._pop_due(time.monotonic())
+            if deadline is None:
+                await self._sleep()
+                continue
+            # Медленный обработчик не задерживает остальные дедлайны
+            task = asyncio.create_task(self._fire(deadline))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _fire(deadline: _Deadline) -> None:
+        try:
+            await deadline.callback()
+        except Exception as e:
+            logger.error(f"Ошибка обработки дедлайна {deadline.key}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"scheduled": len(self._by_key), "heap": len(self._heap)}
+
+    async def close(self) -> None:
+        if self._driver is not None:
+            self._driver.cancel()
+            try:
+                await self._driver
+            except asyncio.CancelledError:
+                pass
+            self._driver = None
+        for task in list(self._running):
+            task.cancel()
+        self._heap.clear()
+        self._by_key.clear()
+
+
+deadline_scheduler = DeadlineScheduler()
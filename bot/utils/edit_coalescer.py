@@ -0,0 +1,94 @@
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+# Правка сообщения: корутина без аргументов, читающая актуальные данные
+# в момент вызова
+EditFactory = Callable[[], Awaitable]
+
+
+class EditCoalescer:
+    """
+    Объединяет частые правки одного сообщения: не чаще одной правки
+    за window секунд на сообщение. Первая правка уходит сразу, все
+    запросы внутри окна схлопываются в одну правку в конце окна,
+    которая показывает последнее состояние.
+    :param window: Минимальный интервал между правками сообщения (секунды)
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._pending: Dict[Hashable, EditFactory] = {}
+        self._last_edit: Dict[Hashable, float] = {}
+        self._workers: Dict[Hashable, asyncio.Task] = {}
+
+    def request(self, key: Hashable, edit: EditFactory) -> None:
+        """
+        Запрашивает правку сообщения key. Более ранняя
+        неотправленная правка того же сообщения заменяется.
+        """
+        self._pending[key] = edit
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key))
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Отменяет правки сообщения (например, если оно удалено).
+        """
+        self._pending.pop(key, None)
+        self._last_edit.pop(key, None)
+        worker = self._workers.pop(key, None)
+        if worker is not None:
+            worker.cancel()
+
+    async def _drain(self, key: Hashable) -> None:
+        try:
+            while key in self._pending:
+                delay = (self._last_edit.get(key, float("-inf"))
+                         + self.window - time.monotonic())
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                edit = self._pending.pop(key, None)
+                if edit is None:
+                    break
+                await self._apply(key, edit)
+                self._last_edit[key] = time.monotonic()
+        finally:
+            if self._workers.get(key) is asyncio.current_task():
+                del self._workers[key]
+            # Окно давно закрыто — время последней правки больше не нужно
+            self._forget_stale()
+
+    async def _apply(self, key: Hashable, edit: EditFactory) -> None:
+        try:
+            await edit()
+        except TelegramRetryAfter as e:
+            logging.warning(f"Правка {key} отложена на {e.retry_after} с")
+            # Повторяем с последним состоянием, если новых правок не было
+            self._pending.setdefault(key, edit)
+            await asyncio.sleep(e.retry_after)
+        except TelegramBadRequest as e:
+            # "message is not modified" и удалённые сообщения
+            logging.debug(f"Правка {key} не применена: {e.message}")
+        except Exception as e:
+            logging.error(f"Ошибка при правке сообщения {key}: {e}")
+
+    def _forget_stale(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, at in self._last_edit.items()
+                    if now - at > self.window and key not in self._workers]:
+            del self._last_edit[key]
+
+    async def close(self) -> None:
+        """
+        Отменяет все ожидающие правки.
+        """
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._pending.clear()
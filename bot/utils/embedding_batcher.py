@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingQueueFull(Exception):
+    """Очередь на кодирование переполнена, запрос отклонён."""
+
+
+class EmbeddingBatcher:
+    """
+    Собирает тексты из всех чатов в небольшие пачки и кодирует их
+    одним вызовом модели в рабочем потоке. Пачка отправляется,
+    как только набрано max_batch_size текстов или истекло max_wait_ms
+    с момента прихода первого текста.
+    """
+
+    def __init__(self,
+                 encode: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0,
+                 max_queue_size: int = 1000):
+        """
+        :param encode: Синхронная функция, кодирующая список текстов
+        в матрицу векторов (строка на текст)
+        :param max_batch_size: Максимальный размер пачки
+        :param max_wait_ms: Сколько ждать добора пачки, в миллисекундах
+        :param max_queue_size: Максимальная глубина очереди
+        """
+        self._encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._worker: Optional[asyncio.Task] = None
+        # Пачка, которая собирается или кодируется прямо сейчас
+        self._batch: List[Tuple[str, asyncio.Future]] = []
+
+    def _ensure_started(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Ставит текст в очередь и ждёт его эмбеддинг.
+        :raises EmbeddingQueueFull: если очередь переполнена
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((text, future))
+        except asyncio.QueueFull:
+            raise EmbeddingQueueFull(
+                f"В очереди уже {self._queue.qsize()} текстов")
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        """
+        Ждёт первый текст, затем добирает пачку до лимита или таймаута.
+        Пачка хранится в self._batch, чтобы stop мог отменить её запросы.
+        """
+        batch = self._batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(),
+                                                    timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            # Пропускаем запросы, которые уже никто не ждёт
+            batch = [(text, fut) for text, fut in batch if not fut.done()]
+            if batch:
+                await self._process_batch(batch)
+            self._batch = []
+
+    async def _process_batch(self,
+                             batch: List[Tuple[str, asyncio.Future]]) -> None:
+        futures = [fut for _, fut in batch]
+        try:
+            vectors = await asyncio.to_thread(
+                self._encode, [text for text, _ in batch])
+        except Exception as e:
+            logger.error(f"Ошибка кодирования пачки из "
+                         f"{len(batch)} текстов: {e}")
+            _resolve(futures, [e] * len(futures), failed=True)
+            return
+        logger.debug(f"Закодирована пачка из {len(batch)} текстов")
+        _resolve(futures, vectors)
+
+    async def stop(self) -> None:
+        """
+        Останавливает обработчик очереди и отменяет ожидающие запросы:
+        и в очереди, и уже взятые в текущую пачку.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for _, fut in self._batch:
+            fut.cancel()
+        self._batch = []
+        while not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            fut.cancel()
+
+
+def _resolve(futures, values, failed: bool = False) -> None:
+    """
+    Передаёт результаты ожидающим вызывающим, пропуская отменённых.
+    """
+    for fut, value in zip(futures, values):
+        if fut.done():
+            continue
+        if failed:
+            fut.set_exception(value)
+        else:
+            fut.set_result(value)
@@ -0,0 +1,97 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram import Bot
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.utils.deadlines import DeadlineScheduler, deadline_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StateTimeout:
+    """
+    Срок ожидания ввода в состоянии FSM.
+    :param seconds: Через сколько секунд состояние сбрасывается
+    :param notice: Сообщение пользователю при сбросе
+    """
+    seconds: float
+    notice: str
+
+
+def state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+class TimeoutStorage(BaseStorage):
+    """
+    Хранилище FSM, сбрасывающее состояния с ограниченным сроком.
+    Переход в зарегистрированное состояние назначает дедлайн
+    в общем планировщике, любой другой переход (в том числе
+    state.clear()) его отменяет. По истечении срока состояние и данные
+    очищаются, а в чат отправляется уведомление.
+    :param storage: Хранилище, в котором лежат состояния
+    :param scheduler: Планировщик дедлайнов
+    """
+
+    def __init__(self, storage: BaseStorage, scheduler: DeadlineScheduler):
+        self.storage = storage
+        self.scheduler = scheduler
+        self.timeouts: Dict[str, StateTimeout] = {}
+        self.bot: Optional[Bot] = None
+
+    def register(self, state: State, seconds: float, notice: str) -> None:
+        """
+        Задаёт срок ожидания ввода для состояния.
+        """
+        self.timeouts[state.state] = StateTimeout(seconds, notice)
+
+    def bind(self, bot: Bot) -> None:
+        """
+        Запоминает бота, через которого отправляются уведомления.
+        """
+        self.bot = bot
+
+    async def set_state(self, key: StorageKey,
+                        state: StateType = None) -> None:
+        await self.storage.set_state(key, state)
+        timeout = self.timeouts.get(state_name(state))
+        if timeout is None:
+            self.scheduler.cancel(key)
+        else:
+            self.scheduler.schedule(
+                key, timeout.seconds,
+                lambda: self._expire(key, state_name(state), timeout))
+
+    async def _expire(self, key: StorageKey, state: str,
+                      timeout: StateTimeout) -> None:
+        if await self.storage.get_state(key) != state:
+            return
+        logger.info(f"Таймаут состояния {state}: пользователь "
+                    f"{key.user_id} в чате {key.chat_id}")
+        await self.storage.set_state(key, None)
+        await self.storage.set_data(key, {})
+        if self.bot is not None:
+            await self.bot.send_message(key.chat_id, timeout.notice,
+                                        message_thread_id=key.thread_id)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey,
+                       data: Mapping[str, Any]) -> None:
+        await self.storage.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return await self.storage.get_data(key)
+
+    async def close(self) -> None:
+        await self.scheduler.close()
+        await self.storage.close()
+
+
+fsm_storage = TimeoutStorage(MemoryStorage(), deadline_scheduler)
@@ -1,7 +1,8 @@
 import random
 import logging
-from datetime import datetime, timezone
+from datetime import datetime
 from aiogram.utils.markdown import hlink
+from sqlalchemy import select
 
 from bot.database import SessionLocal
 from bot.models import LastWinner, WinnerStats, Participant
@@ -9,106 +10,98 @@ from bot.models import LastWinner, WinnerStats, Participant
 logger = logging.getLogger(__name__)
 
 
-def update_last_winner(chat_id: str,
-                       chat_title: str,
-                       user_id: str,
-                       full_name: str,
-                       username: str) -> None:
+async def update_last_winner(chat_id: str,
+                             chat_title: str,
+                             user_id: str,
+                             full_name: str,
+                             username: str) -> None:
     """Обновляет или создаёт запись о последнем
     победителе для заданного чата."""
-    session = SessionLocal()
-    try:
-        last = (session.query(LastWinner)
-                .filter(LastWinner.chat_id == chat_id).first())
-        now = datetime.now(timezone.utc)
-        if last is None:
-            last = LastWinner(
-                chat_id=chat_id,
-                chat_title=chat_title,
-                last_datetime=now,
-                winner_user_id=user_id,
-                winner_full_name=full_name,
-                winner_username=username or ""
-            )
-            session.add(last)
-        else:
-            last.chat_title = chat_title
-            last.last_datetime = now
-            last.winner_user_id = user_id
-            last.winner_full_name = full_name
-            last.winner_username = username or ""
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        logger.error("Ошибка обновления последнего победителя: %s", e)
-        raise
-    finally:
-        session.close()
-
-
-def update_winner_stats(chat_id: str,
-                        chat_title: str,
-                        user_id: str,
-                        full_name: str,
-                        username: str) -> None:
+    async with SessionLocal() as session:
+        try:
+            last = await session.scalar(
+                select(LastWinner).where(LastWinner.chat_id == chat_id))
+            # last_datetime — naive DateTime, храним UTC без часового пояса
+            now = datetime.utcnow()
+            if last is None:
+                last = LastWinner(
+                    chat_id=chat_id,
+                    chat_title=chat_title,
+                    last_datetime=now,
+                    winner_user_id=user_id,
+                    winner_full_name=full_name,
+                    winner_username=username or ""
+                )
+                session.add(last)
+            else:
+                last.chat_title = chat_title
+                last.last_datetime = now
+                last.winner_user_id = user_id
+                last.winner_full_name = full_name
+                last.winner_username = username or ""
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка обновления последнего победителя: %s", e)
+            raise
+
+
+async def update_winner_stats(chat_id: str,
+                              chat_title: str,
+                              user_id: str,
+                              full_name: str,
+                              username: str) -> None:
     """Обновляет статистику побед для пользователя в заданном чате."""
-    session = SessionLocal()
-    try:
-        stats = session.query(WinnerStats).filter(
-            WinnerStats.chat_id == chat_id,
-            WinnerStats.user_id == user_id
-        ).first()
-        if stats is None:
-            stats = WinnerStats(
-                chat_id=chat_id,
-                chat_title=chat_title,
-                user_id=user_id,
-                full_name=full_name,
-                username=username or "",
-                wins=1
-            )
-            session.add(stats)
-        else:
-            stats.wins += 1
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        logger.error("Ошибка обновления статистики побед: %s", e)
-        raise
-    finally:
-        session.close()
-
-
-def get_last_winner(chat_id: str):
+    async with SessionLocal() as session:
+        try:
+            stats = await session.scalar(select(WinnerStats).where(
+                WinnerStats.chat_id == chat_id,
+                WinnerStats.user_id == user_id
+            ))
+            if stats is None:
+                stats = WinnerStats(
+                    chat_id=chat_id,
+                    chat_title=chat_title,
+                    user_id=user_id,
+                    full_name=full_name,
+                    username=username or "",
+                    wins=1
+                )
+                session.add(stats)
+            else:
+                stats.wins += 1
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка обновления статистики побед: %s", e)
+            raise
+
+
+async def get_last_winner(chat_id: str):
     """Возвращает запись о последнем победителе
     для заданного чата (или None)."""
-    session = SessionLocal()
-    try:
-        return (session.query(LastWinner)
-                .filter(LastWinner.chat_id == chat_id).first())
-    finally:
-        session.close()
+    async with SessionLocal() as session:
+        return await session.scalar(
+            select(LastWinner).where(LastWinner.chat_id == chat_id))
 
 
-def is_new_day(chat_id: str) -> bool:
+async def is_new_day(chat_id: str) -> bool:
     """Возвращает True, если текущая дата позже
     даты последнего выбора победителя."""
-    last = get_last_winner(chat_id)
+    last = await get_last_winner(chat_id)
     if not last:
         return True
-    return datetime.now(timezone.utc).date() > last.last_datetime.date()
+    return datetime.utcnow().date() > last.last_datetime.date()
     # return True
 
 
-def get_random_participant(chat_id: str):
+async def get_random_participant(chat_id: str):
     """Возвращает случайного участника из таблицы
     участников для заданного чата."""
-    session = SessionLocal()
-    try:
-        participants = (session.query(Participant)
-                        .filter(Participant.chat_id == chat_id).all())
-    finally:
-        session.close()
+    async with SessionLocal() as session:
+        participants = (await session.scalars(
+            select(Participant).where(Participant.chat_id == chat_id)
+        )).all()
     if participants:
         return random.choice(participants)
     return None
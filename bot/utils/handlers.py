@@ -6,6 +6,7 @@ from bot.commands.add_chat import register_add_chat_handler
 from bot.commands.remove_chat import register_remove_chat_handler
 from bot.commands.get_access import register_get_access_handler
 from bot.commands.search import register_search_handler
+from bot.commands.search_stats import register_search_stats_handler
 from bot.commands.best_qa import register_best_qa_handler
 from bot.commands.best_qa_stat import register_best_qa_stat_handler
 from bot.commands.chat_list import register_chat_list_handler
@@ -14,16 +15,22 @@ from bot.commands.epa_contacts import register_epa_contacts_handler
 from bot.commands.vtb_support import register_vtb_support_handler
 from bot.modules.buttons import register_button_handlers
 from bot.messages.messages import register_message_handlers
+from bot.utils.admin_acl import AdminMiddleware, admin_acl
+from bot.utils.chat_manager import register_chat_admin_handlers
 
 
 def register_handlers(dp):
     """
     Регистрирует все обработчики бота.
     """
+    # Признак администратора нужен командам и кнопкам
+    dp.message.middleware(AdminMiddleware(admin_acl))
+    dp.callback_query.middleware(AdminMiddleware(admin_acl))
     register_start_handler(dp)
     register_help_handler(dp)
     register_docs_handler(dp)
     register_search_handler(dp)
+    register_search_stats_handler(dp)
     register_announce_handler(dp)
     register_add_chat_handler(dp)
     register_remove_chat_handler(dp)
@@ -36,3 +43,4 @@ def register_handlers(dp):
     register_vtb_support_handler(dp)
     register_button_handlers(dp)
     register_message_handlers(dp)
+    register_chat_admin_handlers(dp)
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+from sqlalchemy import delete, select
+
+from bot.database import SessionLocal
+from bot.models import MediaFile
+
+# Каталог со статическими картинками и видео бота
+IMG_DIR = Path(__file__).resolve().parent / "img"
+
+# Отправка медиа: принимает file_id или файл для загрузки
+MediaSender = Callable[[Union[str, FSInputFile]], Awaitable[Message]]
+
+
+def extract_file_id(message: Message) -> Optional[str]:
+    """
+    Достаёт file_id отправленного медиа из ответа Telegram.
+    Для фото берётся самый большой размер.
+    """
+    if message.photo:
+        return message.photo[-1].file_id
+    for media in (message.video, message.animation, message.document,
+                  message.audio, message.voice, message.sticker):
+        if media is not None:
+            return media.file_id
+    return None
+
+
+# Ответы Bot API на устаревший или чужой file_id. Прочие ошибки
+# («file is too big» и т.п.) к file_id не относятся: из-за них
+# сохранённый file_id не сбрасывается
+STALE_FILE_ERRORS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "file reference",
+    "file_reference",
+)
+
+
+def is_stale_file_error(error: TelegramBadRequest) -> bool:
+    """
+    Telegram отклонил file_id (например, после смены токена бота),
+    а не само сообщение.
+    """
+    message = (error.message or "").lower()
+    return any(marker in message for marker in STALE_FILE_ERRORS)
+
+
+class MediaRegistry:
+    """
+    Хранит file_id статических файлов бота. Каждый файл загружается
+    в Telegram один раз, дальше отправляется по file_id. file_id
+    сохраняется в БД, чтобы не загружать файлы заново после перезапуска.
+    """
+
+    def __init__(self, media_dir: Path):
+        self.media_dir = media_dir
+        self._file_ids: Dict[str, str] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._upload_locks: Dict[str, asyncio.Lock] = {}
+
+    async def load(self) -> None:
+        """
+        Загружает сохранённые file_id из БД (один раз).
+        """
+        async with self._load_lock:
+            if self._loaded:
+                return
+            async with SessionLocal() as session:
+                rows = await session.execute(
+                    select(MediaFile.name, MediaFile.file_id))
+                self._file_ids.update({row.name: row.file_id
+                                       for row in rows})
+            self._loaded = True
+            logging.debug(f"Загружено file_id медиа: {len(self._file_ids)}")
+
+    async def _save(self, name: str, file_id: str) -> None:
+        self._file_ids[name] = file_id
+        async with SessionLocal() as session:
+            record = (await session.execute(
+                select(MediaFile).where(MediaFile.name == name)
+            )).scalar_one_or_none()
+            if record is None:
+                session.add(MediaFile(name=name, file_id=file_id))
+            else:
+                record.file_id = file_id
+                record.updated_at = datetime.utcnow()
+            await session.commit()
+
+    async def _forget(self, name: str) -> None:
+        self._file_ids.pop(name, None)
+        async with SessionLocal() as session:
+            await session.execute(
+                delete(MediaFile).where(MediaFile.name == name))
+            await session.commit()
+
+    async def _upload(self, name: str,
+                      send: MediaSender) -> Optional[Message]:
+        """
+        Загружает файл с диска и запоминает полученный file_id.
+        Параллельные первые отправки одного файла загружают его один раз.
+        """
+        lock = self._upload_locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            file_id = self._file_ids.get(name)
+            if file_id is not None:
+                return await send(file_id)
+
+            path = self.media_dir / name
+            if not path.exists():
+                logging.error(f"Файл медиа не найден: {path}")
+                return None
+            sent = await send(FSInputFile(str(path)))
+            file_id = extract_file_id(sent)
+            if file_id is not None:
+                try:
+                    await self._save(name, file_id)
+                except Exception as e:
+                    logging.error(f"Не удалось сохранить file_id "
+                                  f"для '{name}': {e}")
+            return sent
+
+    async def send(self, name: str, send: MediaSender) -> Optional[Message]:
+        """
+        Отправляет файл из каталога медиа по сохранённому file_id,
+        а если его ещё нет или Telegram его отклонил — загружает файл.
+        :param name: Имя файла в каталоге медиа
+        :param send: Функция отправки, принимающая file_id или файл
+        :return: Отправленное сообщение или None, если файла нет
+        """
+        await self.load()
+        file_id = self._file_ids.get(name)
+        if file_id is None:
+            return await self._upload(name, send)
+        try:
+            return await send(file_id)
+        except TelegramBadRequest as e:
+            if not is_stale_file_error(e):
+                raise
+            logging.warning(f"Telegram отклонил file_id '{name}': "
+                            f"{e.message}. Загружаем файл заново.")
+        # Другая отправка могла уже загрузить файл заново
+        if self._file_ids.get(name) == file_id:
+            await self._forget(name)
+        return await self._upload(name, send)
+
+
+media_registry = MediaRegistry(IMG_DIR)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from bot.config.tokens import OPENAI_API_KEY
+from bot.config.settings import (
+    OPENAI_MODEL,
+    OPENAI_MAX_TOKENS,
+    OPENAI_TEMPERATURE,
+    OPENAI_CONNECT_TIMEOUT,
+    OPENAI_READ_TIMEOUT,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_CONCURRENCY,
+    OPENAI_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+
+def record_usage(usage: Optional[Dict[str, int]], reported) -> None:
+    """
+    Переносит расход токенов из ответа API в словарь usage.
+    """
+    if usage is None or reported is None:
+        return
+    usage["prompt_tokens"] = reported.prompt_tokens
+    usage["completion_tokens"] = reported.completion_tokens
+
+
+class CompletionClient:
+    """
+    Асинхронный клиент OpenAI с общим пулом HTTP-соединений.
+    Соединения переиспользуются между запросами, таймауты заданы
+    явно, а число одновременных запросов к модели ограничено
+    max_concurrency, чтобы всплеск /search не исчерпал пул.
+    """
+
+    def __init__(self, api_key: Optional[str], model: str,
+                 max_tokens: int, temperature: float,
+                 max_concurrency: int):
+        self.api_key = api_key
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[AsyncOpenAI] = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        # Клиент создаётся при первом запросе, внутри работающего цикла
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(OPENAI_READ_TIMEOUT,
+                                      connect=OPENAI_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS))
+            self._client = AsyncOpenAI(api_key=self.api_key,
+                                       http_client=http_client,
+                                       max_retries=OPENAI_MAX_RETRIES)
+        return self._client
+
+    async def complete(self, messages: List[Dict[str, str]],
+                       usage: Optional[Dict[str, int]] = None) -> str:
+        """
+        Запрашивает ответ модели.
+        :param messages: Сообщения диалога в формате Chat Completions
+        :param usage: Словарь, в который записывается расход токенов
+        :return: Текст ответа
+        """
+        async with self._semaphore:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
+            )
+        record_usage(usage, response.usage)
+        return response.choices[0].message.content.strip()
+
+    async def stream(self, messages: List[Dict[str, str]],
+                     usage: Optional[Dict[str, int]] = None
+                     ) -> AsyncIterator[str]:
+        """
+        Запрашивает ответ модели потоком.
+        :param messages: Сообщения диалога в формате Chat Completions
+        :param usage: Словарь, в который записывается расход токенов
+        :return: Асинхронный итератор фрагментов текста ответа
+        """
+        async with self._semaphore:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True,
+                # Расход токенов приходит последним фрагментом
+                stream_options={"include_usage": True}
+            )
+            async for chunk in response:
+                record_usage(usage, chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+completion_client = CompletionClient(api_key=OPENAI_API_KEY,
+                                     model=OPENAI_MODEL,
+                                     max_tokens=OPENAI_MAX_TOKENS,
+                                     temperature=OPENAI_TEMPERATURE,
+                                     max_concurrency=OPENAI_MAX_CONCURRENCY)
@@ -0,0 +1,216 @@
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+
+from bot.config.settings import (
+    OUTBOUND_RATE,
+    OUTBOUND_CHAT_RATE,
+    OUTBOUND_CHAT_BURST
+)
+
+logger = logging.getLogger(__name__)
+
+# Классы приоритета исходящих запросов: меньше — важнее
+INTERACTIVE = 0  # ответы на команды и ссылки
+FUN = 1  # картинки и видео развлекательных триггеров
+BROADCAST = 2  # рассылки /announce
+
+# Приоритет запросов текущей задачи. Задачи, созданные внутри,
+# наследуют значение
+outbound_priority: ContextVar[int] = ContextVar("outbound_priority",
+                                                default=INTERACTIVE)
+
+# Методы Bot API, которые пишут в чат и подпадают под лимиты Telegram
+LIMITED_PREFIXES = ("send", "forward", "copy", "edit")
+
+
+@contextmanager
+def send_priority(priority: int) -> Iterator[None]:
+    """
+    Задаёт приоритет исходящих запросов внутри блока with.
+    """
+    token = outbound_priority.set(priority)
+    try:
+        yield
+    finally:
+        outbound_priority.reset(token)
+
+
+def is_limited(method: TelegramMethod) -> bool:
+    return (method.__api_method__.startswith(LIMITED_PREFIXES)
+            and getattr(method, "chat_id", None) is not None)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    chat_id: Hashable = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class OutboundScheduler:
+    """
+    Общая очередь исходящих запросов бота. Разрешения на отправку
+    выдаются одной задачей в порядке приоритета: не больше rate
+    запросов в секунду на всего бота и не больше chat_rate в секунду
+    (с запасом chat_burst) в один чат. Запрос в чат, исчерпавший
+    лимит, не задерживает запросы в другие чаты.
+    """
+
+    def __init__(self, rate: float, chat_rate: float, chat_burst: float):
+        self.rate = rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._waiting: List[_Waiter] = []
+        self._seq = 0
+        self._next_grant = 0.0
+        self._paused_until = 0.0
+        # chat_id -> (запас запросов, момент обновления)
+        self._chats: Dict[Hashable, Tuple[float, float]] = {}
+        self._last_prune = time.monotonic()
+        self._wakeup = asyncio.Event()
+        self._driver: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> None:
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._run())
+
+    async def acquire(self, chat_id: Hashable, priority: int) -> None:
+        """
+        Ждёт разрешения отправить запрос в чат.
+        """
+        self._ensure_started()
+        self._seq += 1
+        waiter = _Waiter(priority, self._seq, chat_id,
+                         asyncio.get_running_loop().create_future())
+        self._waiting.append(waiter)
+        self._wakeup.set()
+        await waiter.future
+
+    def pause(self, seconds: float) -> None:
+        """
+        Приостанавливает выдачу разрешений (после ответа 429).
+        """
+        self._paused_until = max(self._paused_until,
+                                 time.monotonic() + seconds)
+
+    def _chat_tokens(self, chat_id: Hashable, now: float) -> float:
+        tokens, updated = self._chats.get(chat_id, (self.chat_burst, now))
+        return min(self.chat_burst, tokens + (now - updated) * self.chat_rate)
+
+    def _pick(self, now: float) -> Tuple[Optional[_Waiter], float]:
+        """
+        Самый приоритетный запрос в чат, где не исчерпан лимит.
+        :return: (запрос или None, через сколько освободится чат)
+        """
+        self._waiting = [w for w in self._waiting if not w.future.done()]
+        best, wait = None, float("inf")
+        for waiter in self._waiting:
+            tokens = self._chat_tokens(waiter.chat_id, now)
+            if tokens >= 1:
+                if best is None or waiter < best:
+                    best = waiter
+            else:
+                wait = min(wait, (1 - tokens) / self.chat_rate)
+        return best, wait
+
+    def _grant(self, waiter: _Waiter, now: float) -> None:
+        self._waiting.remove(waiter)
+        tokens = self._chat_tokens(waiter.chat_id, now)
+        self._chats[waiter.chat_id] = (tokens - 1, now)
+        self._next_grant = now + 1 / self.rate
+        waiter.future.set_result(None)
+        if now - self._last_prune > 60:
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        # Чаты с полным запасом не отличаются от новых — забываем их
+        self._chats = {chat_id: state for chat_id, state
+                       in self._chats.items()
+                       if self._chat_tokens(chat_id, now) < self.chat_burst}
+        self._last_prune = now
+
+    async def _sleep(self, delay: float) -> None:
+        """
+        Ждёт delay секунд или появления нового запроса.
+        """
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            delay = max(self._next_grant, self._paused_until) - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            waiter, wait = self._pick(now)
+            if waiter is not None:
+                self._grant(waiter, now)
+            else:
+                await self._sleep(None if wait == float("inf") else wait)
+
+    def stats(self) -> Dict[str, int]:
+        waiting = [w for w in self._waiting if not w.future.done()]
+        return {"waiting": len(waiting),
+                "interactive": sum(w.priority == INTERACTIVE
+                                   for w in waiting),
+                "tracked_chats": len(self._chats)}
+
+    async def close(self) -> None:
+        if self._driver is not None:
+            self._driver.cancel()
+            try:
+                await self._driver
+            except asyncio.CancelledError:
+                pass
+            self._driver = None
+        for waiter in self._waiting:
+            if not waiter.future.done():
+                waiter.future.cancel()
+        self._waiting.clear()
+
+
+class OutboundMiddleware(BaseRequestMiddleware):
+    """
+    Пропускает все запросы бота, пишущие в чаты, через планировщик.
+    Приоритет берётся из outbound_priority, остальные запросы
+    (getUpdates, answerCallbackQuery и т. п.) идут без очереди.
+    """
+
+    def __init__(self, scheduler: OutboundScheduler):
+        self.scheduler = scheduler
+
+    async def __call__(self, make_request: NextRequestMiddlewareType,
+                       bot: Bot, method: TelegramMethod):
+        if not is_limited(method):
+            return await make_request(bot, method)
+        await self.scheduler.acquire(method.chat_id,
+                                     outbound_priority.get())
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            # Лимит превышен — притормаживаем все исходящие запросы
+            self.scheduler.pause(e.retry_after)
+            raise
+
+
+outbound_scheduler = OutboundScheduler(rate=OUTBOUND_RATE,
+                                       chat_rate=OUTBOUND_CHAT_RATE,
+                                       chat_burst=OUTBOUND_CHAT_BURST)
@@ -1,8 +1,135 @@
+import asyncio
 import logging
 from datetime import datetime
-from bot.database import SessionLocal
+from typing import Dict, Optional, Tuple
+
+from bot.config.settings import (
+    PARTICIPANTS_FLUSH_INTERVAL,
+    PARTICIPANTS_FLUSH_THRESHOLD
+)
+from bot.database import SessionLocal, dialect_insert
 from bot.models import Participant
 
+# Ключ участника: (chat_id, user_id)
+ParticipantKey = Tuple[str, str]
+
+# Поля, которые обновляются у уже известного участника
+_UPDATED_FIELDS = ("full_name", "username", "chat_title", "last_active")
+
+
+async def _write_batch(entries: Dict[ParticipantKey, dict]) -> None:
+    """
+    Записывает пачку участников одним INSERT ... ON CONFLICT DO UPDATE:
+    новые добавляются, известные обновляются. Уникальность
+    (chat_id, user_id) держит база, поэтому одновременные сбросы
+    не создают дублей.
+    """
+    stmt = dialect_insert(Participant)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Participant.chat_id, Participant.user_id],
+        set_={name: stmt.excluded[name] for name in _UPDATED_FIELDS})
+    async with SessionLocal() as session:
+        try:
+            await session.execute(stmt, list(entries.values()))
+            await session.commit()
+            logging.debug(f"Участники сохранены: {len(entries)}")
+        except Exception:
+            await session.rollback()
+            raise
+
+
+class ParticipantRegistry:
+    """
+    Копит обновления участников в памяти и сбрасывает их в БД
+    одной пачкой: по таймеру или при накоплении flush_threshold
+    изменённых записей. Обработка сообщения не ждёт базу данных.
+    """
+
+    def __init__(self, flush_interval: float, flush_threshold: int):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._dirty: Dict[ParticipantKey, dict] = {}
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def touch(self, message) -> None:
+        """
+        Отмечает активность автора сообщения в чате.
+        """
+        user = message.from_user
+        chat_id = str(message.chat.id)
+        user_id = str(user.id)
+        self._dirty[(chat_id, user_id)] = {
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "full_name": user.full_name,
+            "username": user.username or "",
+            "chat_title": message.chat.title or "",
+            "last_active": datetime.utcnow(),
+        }
+        if len(self._dirty) >= self.flush_threshold:
+            self._flush_requested.set()
+
+    async def flush(self) -> int:
+        """
+        Сбрасывает накопленные изменения в БД.
+        :return: Количество записанных участников
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return 0
+            batch, self._dirty = self._dirty, {}
+            try:
+                await _write_batch(batch)
+            except Exception as e:
+                logging.error(f"Ошибка при сохранении участников: {e}")
+                # Возвращаем несохранённое, не затирая более свежие данные
+                for key, fields in batch.items():
+                    self._dirty.setdefault(key, fields)
+                return 0
+            return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(),
+                                       self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновый сброс и записывает всё, что осталось.
+        """
+        if self._worker is not None:
+            # Под блокировкой сброс не идёт, поэтому отмена
+            # не прервёт запись пачки на середине
+            async with self._flush_lock:
+                self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self.flush()
+
+
+participant_registry = ParticipantRegistry(
+    flush_interval=PARTICIPANTS_FLUSH_INTERVAL,
+    flush_threshold=PARTICIPANTS_FLUSH_THRESHOLD
+)
+
 
 def update_participant(message) -> None:
     # Если сообщение пришло из личного чата, не добавляем участника
@@ -10,39 +137,4 @@ def update_participant(message) -> None:
         logging.debug("Сообщение из личного чата: "
                       "участник не добавляется в таблицу.")
         return
-
-    user = message.from_user
-    chat_id = str(message.chat.id)
-    session = SessionLocal()
-    try:
-        participant = session.query(Participant).filter(
-            Participant.chat_id == chat_id,
-            Participant.user_id == str(user.id)
-        ).first()
-
-        if participant is None:
-            # Создаем новую запись для участника с названием чата
-            participant = Participant(
-                chat_id=chat_id,
-                user_id=str(user.id),
-                full_name=user.full_name,
-                username=user.username or "",
-                chat_title=message.chat.title or ""
-            )
-            session.add(participant)
-            session.commit()
-            logging.info(f"Добавлен новый участник: {user.full_name} "
-                         f"(ID: {user.id}) в чат {chat_id}")
-        else:
-            # Обновляем время последней активности и
-            # название чата (на случай, если оно изменилось)
-            participant.last_active = datetime.utcnow()
-            participant.chat_title = message.chat.title or ""
-            session.commit()
-            logging.debug(f"Обновлена активность участника: {user.full_name} "
-                          f"(ID: {user.id}) в чат {chat_id}")
-    except Exception as e:
-        session.rollback()
-        logging.error(f"Ошибка при обновлении участника: {e}")
-    finally:
-        session.close()
+    participant_registry.touch(message)
@@ -0,0 +1,108 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from bot.config.settings import REACTIONS_CACHE_SIZE
+from bot.database import SessionLocal
+from bot.models import LinkReaction
+
+# Ключ сообщения: (chat_id, message_id)
+MessageKey = Tuple[str, int]
+
+
+@dataclass
+class ReactionCounts:
+    """
+    Голоса за одно сообщение.
+    :param votes: user_id -> True (лайк) или False (дизлайк)
+    """
+    votes: Dict[str, bool] = field(default_factory=dict)
+
+    @property
+    def likes(self) -> int:
+        return sum(1 for is_like in self.votes.values() if is_like)
+
+    @property
+    def dislikes(self) -> int:
+        return len(self.votes) - self.likes
+
+
+async def _load_votes(key: MessageKey) -> ReactionCounts:
+    chat_id, message_id = key
+    async with SessionLocal() as session:
+        rows = await session.execute(
+            select(LinkReaction.user_id, LinkReaction.is_like).where(
+                LinkReaction.chat_id == chat_id,
+                LinkReaction.message_id == message_id))
+        return ReactionCounts({row.user_id: row.is_like for row in rows})
+
+
+class ReactionStore:
+    """
+    Счётчики лайков и дизлайков под ответами со ссылками.
+    Голоса хранятся в БД, последние max_messages сообщений —
+    ещё и в памяти (LRU), чтобы нажатие кнопки не читало базу.
+    """
+
+    def __init__(self, max_messages: int):
+        self.max_messages = max_messages
+        self._cache: "OrderedDict[MessageKey, ReactionCounts]" = (
+            OrderedDict())
+
+    async def get(self, chat_id, message_id: int) -> ReactionCounts:
+        key = (str(chat_id), message_id)
+        counts = self._cache.get(key)
+        if counts is not None:
+            self._cache.move_to_end(key)
+            return counts
+        loaded = await _load_votes(key)
+        # Пока шла загрузка, запись могла появиться из другого нажатия
+        counts = self._cache.setdefault(key, loaded)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_messages:
+            self._cache.popitem(last=False)
+        return counts
+
+    async def vote(self, chat_id, message_id: int,
+                   user_id, is_like: bool) -> Tuple[bool, ReactionCounts]:
+        """
+        Учитывает голос пользователя, если он ещё не голосовал
+        за это сообщение.
+        :return: (голос учтён, текущие счётчики)
+        """
+        counts = await self.get(chat_id, message_id)
+        user_id = str(user_id)
+        if user_id in counts.votes:
+            return False, counts
+        counts.votes[user_id] = is_like
+        try:
+            async with SessionLocal() as session:
+                await session.execute(insert(LinkReaction).values(
+                    chat_id=str(chat_id), message_id=message_id,
+                    user_id=user_id, is_like=is_like))
+                await session.commit()
+        except IntegrityError:
+            # Голос уже записан (повторное нажатие из другого процесса)
+            logging.debug(f"Повторный голос {user_id} за сообщение "
+                          f"{chat_id}:{message_id}")
+        except Exception as e:
+            logging.error(f"Ошибка при сохранении голоса: {e}")
+        return True, counts
+
+    async def forget(self, chat_id, message_id: int) -> None:
+        """
+        Удаляет голоса за сообщение (после удаления самого сообщения).
+        """
+        self._cache.pop((str(chat_id), message_id), None)
+        async with SessionLocal() as session:
+            await session.execute(delete(LinkReaction).where(
+                LinkReaction.chat_id == str(chat_id),
+                LinkReaction.message_id == message_id))
+            await session.commit()
+
+
+reaction_store = ReactionStore(REACTIONS_CACHE_SIZE)
@@ -2,9 +2,66 @@ import logging
 import asyncio
 from aiogram import Bot, Dispatcher
 from bot.config.tokens import API_TOKEN
-from bot.database import init_db
+from bot.config.flags import SEMANTIC_MATCH_ENABLE
+from bot.database import init_db, close_db
 from bot.utils.handlers import register_handlers
 from bot.modules.commands_list import set_bot_commands
+from bot.messages.message_parse import SEMANTIC_MATCHER
+from bot.messages.messages import (
+    TRIGGER_PIPELINE,
+    recent_links,
+    reaction_edits
+)
+from bot.config.settings import (
+    RECENT_LINKS_SWEEP_INTERVAL,
+    TRIGGER_STATS_INTERVAL
+)
+from bot.utils.participants import participant_registry
+from bot.utils.media_registry import media_registry
+from bot.utils.announce_jobs import announce_runner
+from bot.utils.outbound import OutboundMiddleware, outbound_scheduler
+from bot.utils.openai_client import completion_client
+from bot.commands.search import answer_edits
+from bot.utils.search_log import search_log_writer
+from bot.utils.admin_acl import admin_acl
+from bot.utils.fsm_timeouts import fsm_storage
+
+
+async def on_startup(bot: Bot) -> None:
+    """
+    Запускает фоновые сервисы после старта диспетчера.
+    """
+    participant_registry.start()
+    # Права администраторов проверяются по списку в памяти
+    await admin_acl.start()
+    search_log_writer.start()
+    # Уведомления об истёкшем ожидании ввода отправляет этот бот
+    fsm_storage.bind(bot)
+    recent_links.start(RECENT_LINKS_SWEEP_INTERVAL)
+    TRIGGER_PIPELINE.start(TRIGGER_STATS_INTERVAL)
+    # Сохранённые file_id медиа читаем один раз при старте
+    await media_registry.load()
+    # Продолжаем рассылки, прерванные перезапуском
+    await announce_runner.resume(bot)
+
+
+async def on_shutdown() -> None:
+    """
+    Останавливает фоновые сервисы и сохраняет накопленные данные
+    перед завершением бота.
+    """
+    await announce_runner.stop()
+    await admin_acl.stop()
+    await participant_registry.stop()
+    await search_log_writer.stop()
+    await recent_links.stop()
+    await TRIGGER_PIPELINE.stop()
+    await reaction_edits.close()
+    await answer_edits.close()
+    await SEMANTIC_MATCHER.close()
+    await completion_client.close()
+    await outbound_scheduler.close()
+    await close_db()
 
 
 async def run_bot():
@@ -14,14 +71,24 @@ async def run_bot():
     logging.basicConfig(level=logging.DEBUG)
 
     # Инициализация базы данных
-    init_db()
+    await init_db()
+
+    # Заранее строим семантический индекс ссылок, чтобы первое
+    # сообщение в чате не ждало загрузки модели
+    if SEMANTIC_MATCH_ENABLE:
+        await SEMANTIC_MATCHER.warm_up()
 
     # Инициализация бота и диспетчера
     bot = Bot(token=API_TOKEN)
-    dp = Dispatcher()
+    # Все сообщения бота проходят через общую очередь с приоритетами
+    bot.session.middleware(OutboundMiddleware(outbound_scheduler))
+    # Состояния команд сбрасываются по истечении срока ожидания ввода
+    dp = Dispatcher(storage=fsm_storage)
 
     # Регистрация обработчиков
     register_handlers(dp)
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
 
     # Устанавливаем команды, передавая напрямую экземпляр bot
     await set_bot_commands(bot, user_is_admin=True)
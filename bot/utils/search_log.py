@@ -0,0 +1,367 @@
+import json
+import math
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, tuple_
+
+from bot.config.settings import (
+    SEARCH_LOG_FLUSH_INTERVAL,
+    SEARCH_LOG_FLUSH_THRESHOLD,
+    SEARCH_LOG_MAX_BUFFER
+)
+from bot.database import SessionLocal
+from bot.models import SearchLog, SearchRollup
+from bot.utils.answer_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы задержек (в миллисекундах).
+# Последняя корзина гистограммы — всё, что дольше
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2000, 3000, 5000, 8000,
+                      13000, 20000, 30000, 60000)
+# Сводка по всем запросам часа хранится под этим ключом
+# (нормализованный запрос не может содержать "*")
+ROLLUP_TOTAL = "*"
+# Длина текста запроса в сводке
+ROLLUP_QUERY_LENGTH = 200
+
+# Ключ сводки: (начало часа, нормализованный запрос)
+RollupKey = Tuple[datetime, str]
+
+# Сколько ключей запрашивать в одном SELECT ... IN
+_SELECT_CHUNK = 400
+
+
+def hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+@dataclass
+class SearchRecord:
+    """
+    Запись журнала /search. Заполняется по ходу обработки запроса
+    и уходит в SearchLogWriter после ответа.
+    """
+    user_id: str
+    username: str
+    full_name: str
+    query: str
+    # Время сообщения (UTC, без часового пояса)
+    timestamp: datetime
+    cache_hit: Optional[str] = None
+    latency_ms: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    error: Optional[str] = None
+    started: float = field(default_factory=time.monotonic, repr=False)
+
+    @classmethod
+    def from_message(cls, message, query: str) -> "SearchRecord":
+        user = message.from_user
+        return cls(user_id=str(user.id),
+                   username=user.username or "",
+                   full_name=user.full_name,
+                   query=query,
+                   timestamp=message.date.replace(tzinfo=None))
+
+    def finish(self) -> None:
+        """
+        Фиксирует задержку ответа.
+        """
+        self.latency_ms = int((time.monotonic() - self.started) * 1000)
+
+    def set_usage(self, usage: Dict[str, int]) -> None:
+        """
+        Запоминает расход токенов, полученный от OpenAI.
+        """
+        self.prompt_tokens = usage.get("prompt_tokens")
+        self.completion_tokens = usage.get("completion_tokens")
+
+    def columns(self) -> dict:
+        return {"user_id": self.user_id,
+                "username": self.username,
+                "full_name": self.full_name,
+                "query": self.query,
+                "timestamp": self.timestamp,
+                "cache_hit": self.cache_hit,
+                "latency_ms": self.latency_ms,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "error": self.error}
+
+    @property
+    def tokens(self) -> int:
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+
+@dataclass
+class RollupDelta:
+    """
+    Прирост почасовой сводки от пачки записей.
+    """
+    requests: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    tokens: int = 0
+    hist: List[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+
+    def add(self, record: SearchRecord) -> None:
+        self.requests += 1
+        self.cache_hits += record.cache_hit is not None
+        self.errors += record.error is not None
+        self.tokens += record.tokens
+        if record.latency_ms is not None:
+            self.hist[bisect_left(LATENCY_BUCKETS_MS,
+                                  record.latency_ms)] += 1
+
+    def apply(self, row: SearchRollup) -> None:
+        row.requests += self.requests
+        row.cache_hits += self.cache_hits
+        row.errors += self.errors
+        row.tokens += self.tokens
+        row.latency_hist = json.dumps(merge_hists(
+            [json.loads(row.latency_hist), self.hist]))
+
+    def new_row(self, key: RollupKey) -> SearchRollup:
+        return SearchRollup(hour=key[0], query=key[1],
+                            requests=self.requests,
+                            cache_hits=self.cache_hits,
+                            errors=self.errors,
+                            tokens=self.tokens,
+                            latency_hist=json.dumps(self.hist))
+
+
+def merge_hists(hists: List[List[int]]) -> List[int]:
+    merged = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for hist in hists:
+        for i, count in enumerate(hist):
+            merged[i] += count
+    return merged
+
+
+def percentile(hist: List[int], share: float) -> Optional[float]:
+    """
+    Оценивает перцентиль задержки по гистограмме.
+    :param share: Доля запросов (0.5 для p50)
+    :return: Верхняя граница корзины в мс, inf для последней корзины
+    или None, если данных нет
+    """
+    total = sum(hist)
+    if not total:
+        return None
+    target = math.ceil(share * total)
+    seen = 0
+    for i, count in enumerate(hist):
+        seen += count
+        if seen >= target:
+            break
+    return (LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS)
+            else math.inf)
+
+
+def aggregate(records: List[SearchRecord]) -> Dict[RollupKey, RollupDelta]:
+    """
+    Сводит записи по часам: по каждому запросу и по всем вместе.
+    """
+    deltas: Dict[RollupKey, RollupDelta] = {}
+    for record in records:
+        hour = hour_start(record.timestamp)
+        query = normalize_query(record.query)[:ROLLUP_QUERY_LENGTH]
+        for key in ((hour, ROLLUP_TOTAL), (hour, query)):
+            deltas.setdefault(key, RollupDelta()).add(record)
+    return deltas
+
+
+async def _write_rollups(session,
+                         deltas: Dict[RollupKey, RollupDelta]) -> None:
+    keys = list(deltas)
+    existing: Dict[RollupKey, SearchRollup] = {}
+    for i in range(0, len(keys), _SELECT_CHUNK):
+        rows = await session.scalars(select(SearchRollup).where(
+            tuple_(SearchRollup.hour,
+                   SearchRollup.query).in_(keys[i:i + _SELECT_CHUNK])))
+        existing.update({(row.hour, row.query): row for row in rows})
+    for key, delta in deltas.items():
+        if key in existing:
+            delta.apply(existing[key])
+        else:
+            session.add(delta.new_row(key))
+
+
+async def _write_batch(records: List[SearchRecord]) -> None:
+    """
+    Записывает пачку записей и обновляет почасовые сводки
+    одной транзакцией.
+    """
+    async with SessionLocal() as session:
+        try:
+            await session.execute(insert(SearchLog),
+                                  [record.columns() for record in records])
+            await _write_rollups(session, aggregate(records))
+            await session.commit()
+            logger.debug(f"Журнал /search: записано {len(records)}")
+        except Exception:
+            await session.rollback()
+            raise
+
+
+class SearchLogWriter:
+    """
+    Отложенная запись журнала /search: записи копятся в памяти
+    и сбрасываются в БД пачкой по таймеру или при накоплении
+    flush_threshold записей. Ответ пользователю не ждёт базу данных.
+    Если база недоступна, в памяти остаётся не больше max_buffer
+    последних записей.
+    """
+
+    def __init__(self, flush_interval: float, flush_threshold: int,
+                 max_buffer: int):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_buffer = max_buffer
+        self._buffer: List[SearchRecord] = []
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def add(self, record: SearchRecord) -> None:
+        self._buffer.append(record)
+        self._trim()
+        if len(self._buffer) >= self.flush_threshold:
+            self._flush_requested.set()
+
+    def _trim(self) -> None:
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            logger.warning(f"Журнал /search: буфер переполнен, "
+                           f"отброшено записей: {overflow}")
+
+    async def flush(self) -> int:
+        """
+        Сбрасывает накопленные записи в БД.
+        :return: Количество записанных записей
+        """
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            batch, self._buffer = self._buffer, []
+            try:
+                await _write_batch(batch)
+            except Exception as e:
+                logger.error(f"Ошибка при записи журнала /search: {e}")
+                self._buffer[:0] = batch
+                self._trim()
+                return 0
+            return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(),
+                                       self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Останавливает фоновый сброс и записывает всё, что осталось.
+        """
+        if self._worker is not None:
+            async with self._flush_lock:
+                self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self.flush()
+
+
+search_log_writer = SearchLogWriter(
+    flush_interval=SEARCH_LOG_FLUSH_INTERVAL,
+    flush_threshold=SEARCH_LOG_FLUSH_THRESHOLD,
+    max_buffer=SEARCH_LOG_MAX_BUFFER
+)
+
+
+@dataclass
+class SearchReport:
+    hours: int
+    requests: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    tokens: int = 0
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    top_queries: List[Tuple[str, int]] = field(default_factory=list)
+
+
+async def search_report(hours: int, top: int = 10) -> SearchReport:
+    """
+    Собирает отчёт по /search за последние hours часов из почасовых
+    сводок (журнал запросов не читается).
+    """
+    since = hour_start(datetime.utcnow()) - timedelta(hours=hours - 1)
+    report = SearchReport(hours=hours)
+    async with SessionLocal() as session:
+        totals = (await session.scalars(select(SearchRollup).where(
+            SearchRollup.hour >= since,
+            SearchRollup.query == ROLLUP_TOTAL))).all()
+        requests = func.sum(SearchRollup.requests)
+        top_rows = await session.execute(
+            select(SearchRollup.query, requests)
+            .where(SearchRollup.hour >= since,
+                   SearchRollup.query != ROLLUP_TOTAL)
+            .group_by(SearchRollup.query)
+            .order_by(requests.desc())
+            .limit(top))
+    for row in totals:
+        report.requests += row.requests
+        report.cache_hits += row.cache_hits
+        report.errors += row.errors
+        report.tokens += row.tokens
+    hist = merge_hists([json.loads(row.latency_hist) for row in totals])
+    report.p50_ms = percentile(hist, 0.5)
+    report.p95_ms = percentile(hist, 0.95)
+    report.top_queries = [(query, count) for query, count in top_rows]
+    return report
+
+
+def format_latency(latency_ms: Optional[float]) -> str:
+    if latency_ms is None:
+        return "нет данных"
+    if latency_ms == math.inf:
+        return f"> {LATENCY_BUCKETS_MS[-1] / 1000:g} с"
+    return f"≤ {latency_ms / 1000:g} с"
+
+
+def format_search_report(report: SearchReport) -> str:
+    lines = [f"Статистика /search за {report.hours} ч:",
+             f"Запросов: {report.requests} (без OpenAI: "
+             f"{report.cache_hits}, с ошибкой: {report.errors})",
+             f"Токенов: {report.tokens}",
+             f"Задержка: p50 {format_latency(report.p50_ms)}, "
+             f"p95 {format_latency(report.p95_ms)}"]
+    if report.top_queries:
+        lines.append("Частые запросы:")
+        lines.extend(f"{i}. {query} — {count}" for i, (query, count)
+                     in enumerate(report.top_queries, start=1))
+    return "\n".join(lines)
@@ -0,0 +1,165 @@
+import sys
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Ключ записи: (группа, ключ внутри группы), например (chat_id, url)
+CacheKey = Tuple[Hashable, Hashable]
+
+
+class TTLCache:
+    """
+    Кэш записей с общим временем жизни, разбитых по группам (например,
+    по чатам). Просроченные записи удаляются при чтении и периодической
+    очисткой, без отдельной задачи на каждую запись.
+
+    Время жизни у всех записей одинаковое, поэтому порядок вставки
+    совпадает с порядком истечения: очистка и вытеснение снимают записи
+    с начала упорядоченного словаря.
+    :param ttl: Время жизни записи в секундах
+    :param max_size: Ограничение на общее число записей (None — без него)
+    :param max_per_group: Ограничение на число записей в группе
+    :param clock: Источник времени (монотонные секунды)
+    """
+
+    def __init__(self, ttl: float,
+                 max_size: Optional[int] = None,
+                 max_per_group: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_per_group = max_per_group
+        self._clock = clock
+        # (группа, ключ) -> (момент истечения, значение)
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = (
+            OrderedDict())
+        # группа -> ключи группы в порядке вставки
+        self._groups: Dict[Hashable, "OrderedDict[Hashable, None]"] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, group: Hashable, key: Hashable, default: Any = None) -> Any:
+        """
+        Возвращает значение записи или default, если её нет или она
+        просрочена (просроченная запись сразу удаляется).
+        """
+        item = self._entries.get((group, key))
+        if item is None:
+            self.misses += 1
+            return default
+        if item[0] <= self._clock():
+            self._remove((group, key))
+            self.expired += 1
+            self.misses += 1
+            return default
+        self.hits += 1
+        return item[1]
+
+    def contains(self, group: Hashable, key: Hashable) -> bool:
+        marker = object()
+        return self.get(group, key, marker) is not marker
+
+    def set(self, group: Hashable, key: Hashable, value: Any = True) -> None:
+        """
+        Добавляет запись или продлевает существующую на полный ttl.
+        При превышении ограничений вытесняются самые старые записи
+        группы, затем самые старые записи всего кэша.
+        """
+        cache_key = (group, key)
+        if cache_key in self._entries:
+            self._remove(cache_key)
+        self._entries[cache_key] = (self._clock() + self.ttl, value)
+        self._groups.setdefault(group, OrderedDict())[key] = None
+
+        group_keys = self._groups[group]
+        if self.max_per_group is not None:
+            while len(group_keys) > self.max_per_group:
+                oldest = next(iter(group_keys))
+                self._remove((group, oldest))
+                self.evicted += 1
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evicted += 1
+
+    def pop(self, group: Hashable, key: Hashable) -> bool:
+        """
+        Удаляет запись. Возвращает True, если она была в кэше.
+        """
+        if (group, key) not in self._entries:
+            return False
+        self._remove((group, key))
+        return True
+
+    def _remove(self, cache_key: CacheKey) -> None:
+        del self._entries[cache_key]
+        group, key = cache_key
+        group_keys = self._groups[group]
+        del group_keys[key]
+        if not group_keys:
+            # Пустые группы не копятся
+            del self._groups[group]
+
+    def sweep(self) -> int:
+        """
+        Удаляет все просроченные записи.
+        :return: Количество удалённых записей
+        """
+        now = self._clock()
+        removed = 0
+        while self._entries:
+            cache_key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._remove(cache_key)
+            removed += 1
+        self.expired += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Сводка по кэшу: размер, счётчики попаданий и удалений и
+        примерный объём памяти под служебные структуры (в байтах).
+        """
+        approx_bytes = sys.getsizeof(self._entries) + sum(
+            sys.getsizeof(keys) for keys in self._groups.values())
+        return {"entries": len(self._entries),
+                "groups": len(self._groups),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "approx_bytes": approx_bytes}
+
+    async def _run_sweeper(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            removed = self.sweep()
+            if removed:
+                logging.debug(f"Из кэша удалено просроченных записей: "
+                              f"{removed}")
+
+    def start(self, sweep_interval: float) -> None:
+        """
+        Запускает периодическую очистку просроченных записей.
+        """
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(
+                self._run_sweeper(sweep_interval))
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None